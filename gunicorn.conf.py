@@ -0,0 +1,72 @@
+"""
+Gunicorn settings for the web dyno (Procfile: gunicorn -c gunicorn.conf.py ...).
+
+The app is imported once in the master and the forecast models are loaded there
+before forking, so every worker shares the same weight and scaler pages
+copy-on-write instead of loading its own copy on its first forecast. gc.freeze()
+keeps the collector from touching those objects' headers and un-sharing them.
+Each worker then runs one dummy forecast so its first real request is warm.
+Live forecasts run inside the workers (FORECAST_INFERENCE_MODE=local, unless the
+environment says otherwise), since a spawned process pool would not share any of this.
+
+The numpy backend is the only one preloaded: TensorFlow's runtime is not fork-safe,
+so with FORECAST_BACKEND=keras every worker still loads its own model on demand.
+"""
+import gc
+import logging
+import os
+import resource
+
+# Must be set before the app (and so settings) is loaded
+os.environ.setdefault('FORECAST_INFERENCE_MODE', 'local')
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', 2))
+preload_app = True
+
+logger = logging.getLogger('gunicorn.error')
+
+
+def memory_usage():
+    """RSS, PSS and shared memory of this process in MB (PSS/shared need Linux)."""
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            fields = {line.split(':')[0]: int(line.split()[1]) for line in f if line.split()[-1] == 'kB'}
+        shared = fields.get('Shared_Clean', 0) + fields.get('Shared_Dirty', 0)
+        return {'rss': fields['Rss'] / 1024, 'pss': fields['Pss'] / 1024, 'shared': shared / 1024}
+    except (OSError, KeyError):
+        return {'rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 'pss': None, 'shared': None}
+
+
+def format_memory(usage):
+    if usage['pss'] is None:
+        return f"max RSS {usage['rss']:.0f}MB"
+    return f"RSS {usage['rss']:.0f}MB, PSS {usage['pss']:.0f}MB, shared {usage['shared']:.0f}MB"
+
+
+def when_ready(server):
+    from django.conf import settings
+    from django.db import connections
+    from weather.services.model_registry import model_registry
+
+    if settings.FORECAST_BACKEND == 'numpy':
+        try:
+            model_registry.preload()
+        except OSError as e:
+            logger.warning(f"No forecast model to preload: {str(e)}")
+    # Connections opened in the master must not be shared with the workers
+    connections.close_all()
+    gc.collect()
+    gc.freeze()
+    logger.info(f"Master ready, {format_memory(memory_usage())}")
+
+
+def post_fork(server, worker):
+    from weather.services.forecast_service import ForecastService
+
+    try:
+        elapsed = ForecastService().warm_up()
+    except OSError as e:
+        logger.warning(f"Worker {worker.pid} not warmed up: {str(e)}")
+        return
+    logger.info(f"Worker {worker.pid} warmed up in {elapsed * 1000:.1f}ms, {format_memory(memory_usage())}")
@@ -1,64 +1,52 @@
 
 import os
+import argparse
 import django
-import numpy as np
-import pandas as pd
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import LSTM, Dense
-from sklearn.preprocessing import MinMaxScaler
-import joblib
 
 # 1. Setup Django environment
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "weather_app.settings")
 django.setup()
 
-# 2. Import your model
-from weather.models import HistoricalWeatherData
-
-# 3. Fetch historical weather data
-def load_historical_data():
-    data = HistoricalWeatherData.objects.all().order_by('date').values(
-        'avg_temp', 'avg_humidity', 'avg_wind_speed', 'total_precip_mm'
+# 2. Import the training pipeline
+from weather.services.training import train_all
+
+# 3. Main training function
+def train_model(mode='autoregressive', horizon=7, rebuild=False, workers=None, min_windows=None, epochs=50,
+                dropout=0.0):
+    print(f"🚀 Training {mode} models...")
+    version_dir, manifests = train_all(
+        mode=mode,
+        horizon=horizon,
+        epochs=epochs,
+        workers=workers,
+        min_windows=min_windows,
+        rebuild=rebuild,
+        dropout=dropout,
     )
-    return pd.DataFrame(data)
-
-# 4. Prepare sequences
-def create_sequences(data, seq_length):
-    X, y = [], []
-    for i in range(len(data) - seq_length):
-        X.append(data[i:i+seq_length])
-        y.append(data[i+seq_length, 0])  # Temperature (first feature)
-    return np.array(X), np.array(y)
-
-# 5. Main training function
-def train_model():
-    df = load_historical_data()
-    
-    if df.empty or len(df) < 50:
+    if version_dir is None:
         print("❗ Not enough data to train the model. Need at least 50 records.")
         return
-    
-    features = ['avg_temp', 'avg_humidity', 'avg_wind_speed', 'total_precip_mm']
-    target = 'avg_temp'
-
-    scaler = MinMaxScaler()
-    data_scaled = scaler.fit_transform(df[features])
-
-    seq_length = 30
-    X, y = create_sequences(data_scaled, seq_length)
-
-    model = Sequential()
-    model.add(LSTM(64, activation='relu', input_shape=(seq_length, len(features))))
-    model.add(Dense(1))  # Predict temperature
-    model.compile(optimizer='adam', loss='mse')
-
-    print("🚀 Training model...")
-    model.fit(X, y, epochs=50, batch_size=16, validation_split=0.1)
 
-    # Save the model and scaler
-    model.save('weather_forecast_lstm.h5')
-    joblib.dump(scaler, 'weather_scaler.save')
-    print("✅ Model and scaler saved successfully.")
+    for manifest in sorted(manifests, key=lambda m: m['key']):
+        metrics = manifest['metrics']
+        print(f"   {manifest['key']}: {manifest['data_range']['start']} to {manifest['data_range']['end']}, "
+              f"val_loss {metrics['val_loss']:.5f}, {manifest['training_seconds']}s")
+    print(f"✅ Models and scalers saved to {version_dir}")
 
 if __name__ == "__main__":
-    train_model()
+    parser = argparse.ArgumentParser(description="Train the LSTM weather forecast models")
+    parser.add_argument('--mode', choices=['autoregressive', 'direct'], default='autoregressive',
+                        help="'direct' predicts the whole horizon for all features in one pass")
+    parser.add_argument('--horizon', type=int, default=7, help="Days predicted per pass in direct mode")
+    parser.add_argument('--epochs', type=int, default=50)
+    parser.add_argument('--dropout', type=float, default=0.0,
+                        help="Dropout rate before the output layer; enables Monte Carlo forecast intervals")
+    parser.add_argument('--workers', type=int, help="Parallel training processes (default: FORECAST_TRAIN_WORKERS)")
+    parser.add_argument('--min-windows', type=int,
+                        help="Training windows a location needs for its own model (default: FORECAST_MIN_LOCATION_WINDOWS)")
+    parser.add_argument('--rebuild-dataset', action='store_true',
+                        help="Re-stream history from the database even if the cached dataset looks current")
+    args = parser.parse_args()
+    train_model(mode=args.mode, horizon=args.horizon, rebuild=args.rebuild_dataset,
+                workers=args.workers, min_windows=args.min_windows, epochs=args.epochs,
+                dropout=args.dropout)
@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand
+from weather.services.backtest import Backtest
+from weather.services.statistical import STATISTICAL_FORECASTERS
+
+FORECASTERS = ['persistence', *STATISTICAL_FORECASTERS, 'lstm', 'prophet']
+
+
+class Command(BaseCommand):
+    help = "Rolling-origin backtest of the forecasters: MAE/RMSE per horizon, latency and throughput"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--horizon', type=int, default=7)
+        parser.add_argument('--origins', type=int, default=30, help="Origins per location, newest first")
+        parser.add_argument('--stride', type=int, default=1, help="Days between consecutive origins")
+        parser.add_argument('--since', help="Only origins forecasting days on or after this date (YYYY-MM-DD)")
+        parser.add_argument('--forecaster', choices=FORECASTERS, action='append')
+        parser.add_argument('--prophet-origins', type=int, default=2,
+                            help="Origins per location refitted with Prophet (each is a full fit)")
+        parser.add_argument('--latency-samples', type=int, default=50)
+
+    def handle(self, *args, **options):
+        backtest = Backtest(
+            horizon=options['horizon'],
+            origins=options['origins'],
+            stride=options['stride'],
+            since=options['since'],
+        )
+        if not len(backtest.indices):
+            self.stdout.write(self.style.WARNING("No origins with enough history to backtest"))
+            return
+
+        self.stdout.write(
+            f"Backtesting {len(backtest.indices)} origins over "
+            f"{len(set(backtest.location_ids.tolist()))} locations, horizon {options['horizon']} days"
+        )
+        for name in options['forecaster'] or FORECASTERS:
+            if name == 'lstm':
+                result = backtest.run_lstm(latency_samples=options['latency_samples'])
+            elif name == 'prophet':
+                result = backtest.run_prophet(per_location=options['prophet_origins'])
+            elif name in STATISTICAL_FORECASTERS:
+                result = backtest.run_statistical(name, latency_samples=options['latency_samples'])
+            else:
+                result = backtest.run_persistence()
+            self.report(result)
+
+    def report(self, result):
+        self.stdout.write(self.style.SUCCESS(f"\n{result['forecaster']} ({result['origins']} origins)"))
+        if not result['origins']:
+            return
+        self.stdout.write("  day      MAE     RMSE")
+        for day, (mae, rmse) in enumerate(zip(result['mae'], result['rmse']), start=1):
+            self.stdout.write(f"  +{day:<4} {mae:7.3f}  {rmse:7.3f}")
+        self.stdout.write(f"  all   {result['mae'].mean():7.3f}  {result['rmse'].mean():7.3f}")
+        if result['p50_ms'] is not None:
+            self.stdout.write(
+                f"  latency p50 {result['p50_ms']:.2f}ms / p99 {result['p99_ms']:.2f}ms, "
+                f"throughput {result['throughput']:.1f} forecasts/sec"
+            )
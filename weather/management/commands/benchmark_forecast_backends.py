@@ -0,0 +1,91 @@
+import multiprocessing
+import resource
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+BACKENDS = ['numpy', 'keras']
+
+
+def current_rss_mb():
+    """Resident set size of this process in MB (falls back to peak RSS off Linux)."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_backend(backend, iterations, days, results):
+    """Runs in a fresh process so load time and RSS belong to a single backend."""
+    import django
+    django.setup()
+    from weather.services.forecast_service import ForecastService, FEATURES, SEQUENCE_LENGTH
+    from weather.services.model_registry import model_registry
+
+    rss_before = current_rss_mb()
+    start = time.perf_counter()
+    try:
+        service = ForecastService()
+        artifact_dir = model_registry.resolve_artifact()
+        service.lstm_model = model_registry.get_lstm_model(backend, artifact_dir)
+        service.scaler = model_registry.get_scaler(artifact_dir)
+        service.metadata = model_registry.get_model_metadata(artifact_dir)
+    except ImportError as e:
+        results.put({'backend': backend, 'error': str(e)})
+        return
+    load_time = time.perf_counter() - start
+
+    window = np.random.default_rng(0).random((1, SEQUENCE_LENGTH, len(FEATURES)), dtype=np.float32)
+    service.predict_sequences(window, days)  # warm-up
+
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        service.predict_sequences(window, days)
+        latencies.append(time.perf_counter() - start)
+
+    results.put({
+        'backend': backend,
+        'load_time': load_time,
+        'p50_ms': np.percentile(latencies, 50) * 1000,
+        'p99_ms': np.percentile(latencies, 99) * 1000,
+        'rss_mb': current_rss_mb(),
+        'rss_delta_mb': current_rss_mb() - rss_before,
+    })
+
+
+class Command(BaseCommand):
+    help = "Compare per-forecast latency and worker RSS of the LSTM inference backends"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument('--days', type=int, default=7)
+        parser.add_argument('--backend', choices=BACKENDS, action='append')
+
+    def handle(self, *args, **options):
+        context = multiprocessing.get_context('spawn')
+        results = context.Queue()
+
+        for backend in options['backend'] or BACKENDS:
+            process = context.Process(
+                target=run_backend,
+                args=(backend, options['iterations'], options['days'], results),
+            )
+            process.start()
+            result = results.get()
+            process.join()
+
+            if 'error' in result:
+                self.stdout.write(self.style.WARNING(f"{backend}: unavailable ({result['error']})"))
+                continue
+
+            self.stdout.write(self.style.SUCCESS(
+                f"{backend}: load {result['load_time']:.2f}s, "
+                f"{options['days']}-day forecast p50 {result['p50_ms']:.2f}ms / p99 {result['p99_ms']:.2f}ms, "
+                f"RSS {result['rss_mb']:.0f}MB (+{result['rss_delta_mb']:.0f}MB for the model)"
+            ))
@@ -0,0 +1,93 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+from weather.models import Location
+from weather.services.ingestion import AsyncIngestor
+
+CURRENT = {
+    'temp_c': 28.4, 'humidity': 74, 'wind_kph': 11.2, 'precip_mm': 0.1, 'pressure_mb': 1009,
+    'condition': {'text': 'Partly cloudy', 'icon': '//cdn.weatherapi.com/weather/64x64/day/116.png'},
+}
+RESPONSE = json.dumps({'current': CURRENT}).encode()
+
+
+def stand_in_server(latency):
+    """
+    Local WeatherAPI stand-in answering current.json after `latency` seconds,
+    including POSTed q=bulk lookups.
+    """
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive, like the real API
+
+        def respond(self, body):
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            self.respond(RESPONSE)
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            self.respond(json.dumps({'bulk': [
+                {'query': {**query, 'current': CURRENT}} for query in body['locations']
+            ]}).encode())
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark fetch_data's ingestion against a local WeatherAPI stand-in: sequential "
+        "versus concurrent, for synthetic location counts (nothing is written to the database)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--locations', type=int, action='append', help="Location counts (default: 1000 and 10000)")
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--latency-ms', type=float, default=50, help="Simulated upstream response time")
+        parser.add_argument('--sequential-sample', type=int, default=100,
+                            help="Locations fetched sequentially; the full sequential time is extrapolated from them")
+
+    def handle(self, *args, **options):
+        server = stand_in_server(options['latency_ms'] / 1000)
+        url = f"http://127.0.0.1:{server.server_address[1]}/v1/"
+        self.stdout.write(f"Stand-in WeatherAPI at {url}, {options['latency_ms']:.0f}ms per response")
+
+        try:
+            for count in options['locations'] or [1000, 10000]:
+                # Spread over distinct fetch cells so every location costs a request
+                locations = [
+                    Location(id=i, name=f"Location {i}", latitude=(i // 1000) * 0.1, longitude=(i % 1000) * 0.1)
+                    for i in range(count)
+                ]
+
+                sample = locations[:min(options['sequential_sample'], count)]
+                sequential = AsyncIngestor(api_key='benchmark', base_url=url, concurrency=1, store=False).run(sample)
+                sequential_seconds = sequential['seconds'] * count / len(sample)
+
+                concurrent = AsyncIngestor(
+                    api_key='benchmark', base_url=url, concurrency=options['concurrency'], store=False
+                ).run(locations)
+
+                self.stdout.write(self.style.SUCCESS(
+                    f"{count} locations: sequential ~{sequential_seconds:.1f}s "
+                    f"({sequential['throughput']:.1f}/sec), concurrency {options['concurrency']} "
+                    f"{concurrent['seconds']:.1f}s ({concurrent['throughput']:.1f}/sec), "
+                    f"speedup {sequential_seconds / concurrent['seconds']:.1f}x, "
+                    f"p95 {concurrent['p95_ms']:.0f}ms, failed {concurrent['failed']}"
+                ))
+        finally:
+            server.shutdown()
@@ -1,8 +1,8 @@
 from django.core.management.base import BaseCommand
 from django.utils import timezone
-import requests
 import logging
 from weather.models import Location, WeatherData
+from weather.services.ingestion import AsyncIngestor
 from django.conf import settings
 
 # Set up logging
@@ -11,60 +11,61 @@ logger = logging.getLogger(__name__)
 class Command(BaseCommand):
     help = "Fetch real-time weather data and store it"
 
-    def handle(self, *args, **kwargs):
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=20,
+                            help="Upstream requests in flight at once (1 fetches one location at a time)")
+        parser.add_argument('--per-host', type=int, help="Connections kept open to WeatherAPI (default: --concurrency)")
+        parser.add_argument('--retries', type=int, default=3)
+        parser.add_argument('--batch-size', type=int, default=500, help="Rows per bulk insert")
+
+    def handle(self, *args, **options):
         API_KEY = settings.WEATHER_API_KEY  # Load API Key from settings
 
         if not API_KEY:
             self.stdout.write(self.style.ERROR("Weather API key is missing in settings!"))
             return
 
-        locations = Location.objects.all()
+        locations = list(Location.objects.all())
         if not locations:
             self.stdout.write(self.style.WARNING("No locations found"))
             return
 
-        for location in locations:
-            try:
-                url = f"http://api.weatherapi.com/v1/current.json?key={API_KEY}&q={location.name}"
-                response = requests.get(url, timeout=10)  # Set timeout for reliability
-                response.raise_for_status()  # Raise error if request fails
-
-                data = response.json()
-                
-                # Extract weather details
-                weather_info = data.get("current", {})
-                condition_info = weather_info.get("condition", {})
-
-                # Check if data is valid
-                if not weather_info:
-                    self.stdout.write(self.style.ERROR(f"No weather data found for {location.name}"))
-                    continue
-                
-                # Prevent duplicate data for the same timestamp
-                latest_weather = WeatherData.objects.filter(location=location).order_by("-timestamp").first()
-                if latest_weather and latest_weather.timestamp.hour == timezone.now().hour and latest_weather.timestamp.date() == timezone.now().date():
-                    self.stdout.write(self.style.WARNING(f"Weather data already exists for {location.name} this hour. Skipping."))
-                    continue
-
-                # Save weather data
-                weather_data = WeatherData.objects.create(
-                    location=location,
-                    timestamp=timezone.now(),
-                    temperature=weather_info.get("temp_c"),
-                    humidity=weather_info.get("humidity"),
-                    wind_speed=weather_info.get("wind_kph", 0) / 3.6,  # Convert km/h to m/s
-                    precipitation=weather_info.get("precip_mm", 0),
-                    pressure=weather_info.get("pressure_mb"),
-                    description=condition_info.get("text", "Unknown"),
-                    weather_icon_url=f"https:{condition_info.get('icon', '')}",  # Full icon URL
-                )
+        # Prevent duplicate data for the same hour, checked for every location in one query
+        hour_start = timezone.now().replace(minute=0, second=0, microsecond=0)
+        fetched_this_hour = set(
+            WeatherData.objects.filter(timestamp__gte=hour_start).values_list('location_id', flat=True).distinct()
+        )
+        if fetched_this_hour:
+            self.stdout.write(self.style.WARNING(
+                f"Weather data already exists this hour for {len(fetched_this_hour)} locations. Skipping them."
+            ))
 
-                self.stdout.write(self.style.SUCCESS(f"Weather data stored for {location.name}"))
+        ingestor = AsyncIngestor(
+            api_key=API_KEY,
+            concurrency=options['concurrency'],
+            per_host=options['per_host'],
+            retries=options['retries'],
+            batch_size=options['batch_size'],
+        )
+        stats = ingestor.run(locations, skip_ids=fetched_this_hour)
 
-            except requests.exceptions.RequestException as e:
-                logger.error(f"Failed to fetch weather for {location.name}: {str(e)}")
-                self.stdout.write(self.style.ERROR(f"API error fetching {location.name}: {str(e)}"))
-            except Exception as e:
-                logger.error(f"Unexpected error processing {location.name}: {str(e)}")
-                self.stdout.write(self.style.ERROR(f"Unexpected error for {location.name}: {str(e)}"))
+        for name, error in stats['errors']:
+            self.stdout.write(self.style.ERROR(f"API error fetching {name}: {error}"))
+        self.report(stats, ingestor.client.stats())
 
+    def report(self, stats, client_stats):
+        self.stdout.write(self.style.SUCCESS(
+            f"Stored {stats['stored']} of {stats['locations']} locations in {stats['seconds']:.2f}s "
+            f"({stats['throughput']:.1f} locations/sec)"
+        ))
+        self.stdout.write(
+            f"  {stats['requests']} upstream requests (one per fetch cell), "
+            f"failed {stats['failed']}, without data {stats['empty']}, retries {stats['retries']}"
+        )
+        if stats['p50_ms'] is not None:
+            self.stdout.write(f"  request latency p50 {stats['p50_ms']:.0f}ms / p95 {stats['p95_ms']:.0f}ms")
+        if client_stats['connection_reuse'] is not None:
+            self.stdout.write(
+                f"  {client_stats['connections']} upstream connections, "
+                f"{client_stats['connection_reuse']:.0%} of requests reused one"
+            )
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from weather.services.training import fine_tune
+
+
+class Command(BaseCommand):
+    help = "Fine-tune the current forecast models on history added since their last training"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--epochs', type=int, default=5)
+        parser.add_argument('--learning-rate', type=float, default=1e-4)
+        parser.add_argument('--workers', type=int, help="Parallel processes (default: FORECAST_TRAIN_WORKERS)")
+        parser.add_argument('--rebuild-dataset', action='store_true')
+
+    def handle(self, *args, **options):
+        version_dir, manifests = fine_tune(
+            epochs=options['epochs'],
+            learning_rate=options['learning_rate'],
+            workers=options['workers'],
+            rebuild=options['rebuild_dataset'],
+        )
+
+        for manifest in sorted(manifests, key=lambda m: m['key']):
+            self.stdout.write(f"{manifest['key']}: {manifest['status']}")
+
+        if version_dir is None:
+            self.stdout.write(self.style.WARNING("No new forecast model version published"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Published {version_dir}"))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+from weather.services.model_registry import model_registry
+
+
+class Command(BaseCommand):
+    help = "List published forecast model versions, or switch serving to one of them (rollout or rollback)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('version', nargs='?', help="Version to activate; lists versions when omitted")
+
+    def handle(self, *args, **options):
+        version = options['version']
+        if version is None:
+            active = model_registry.read_pointer()
+            for name in model_registry.versions():
+                marker = '*' if name == active else ' '
+                self.stdout.write(f"{marker} {name}")
+            return
+
+        try:
+            model_registry.publish(version)
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"Activated forecast model version {version}"))
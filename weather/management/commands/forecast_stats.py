@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from weather.services.forecast_cache import forecast_cache
+
+
+class Command(BaseCommand):
+    help = "Report forecast cache hit ratios"
+
+    def handle(self, *args, **kwargs):
+        stats = forecast_cache.stats()
+        self.stdout.write(
+            f"Forecast cache: {stats['hits']} hits, {stats['misses']} misses, "
+            f"hit ratio {stats['hit_ratio']:.1%}"
+        )
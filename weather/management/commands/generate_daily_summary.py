@@ -2,6 +2,7 @@ from django.core.management.base import BaseCommand
 from django.utils import timezone
 from weather.models import WeatherData, HistoricalWeatherData
 from django.db.models import Avg, Max, Min, Sum
+from weather.tasks import compute_forecast_accuracy, fine_tune_forecast_models
 
 class Command(BaseCommand):
     help = "Generate daily weather summary"
@@ -44,3 +45,9 @@ class Command(BaseCommand):
             )
 
             self.stdout.write(self.style.SUCCESS(f"Stored summary for {location_id} on {yesterday}"))
+
+        # Fold yesterday into the models, then refresh materialized forecasts (queued by the task)
+        fine_tune_forecast_models.delay()
+        # Yesterday's actuals are in, so score the forecasts made for it
+        compute_forecast_accuracy.delay()
+        self.stdout.write(self.style.SUCCESS("Queued model fine-tune, forecast precompute and accuracy update"))
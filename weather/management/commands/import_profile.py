@@ -0,0 +1,69 @@
+import json
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+HEAVY_MODULES = ['tensorflow', 'keras', 'prophet', 'pandas', 'sklearn', 'joblib', 'h5py']
+
+# Runs in a fresh interpreter under -X importtime: the same work a web worker
+# (django.setup + URL resolution) and a Celery ingestion worker do at startup.
+PROFILE_SCRIPT = """
+import json, sys, django
+django.setup()
+from django.urls import resolve
+for path in {paths!r}:
+    resolve(path)
+import weather.tasks
+print(json.dumps(sorted(m for m in {heavy!r} if m in sys.modules)))
+"""
+
+
+class Command(BaseCommand):
+    help = "Profile import time of django.setup() plus URL resolution and check heavy ML modules stay unloaded"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=15, help="Number of slowest top-level packages to list")
+        parser.add_argument('--strict', action='store_true', help="Fail if any heavy ML module was imported")
+
+    def handle(self, *args, **options):
+        script = PROFILE_SCRIPT.format(
+            paths=['/api/dashboard/', '/api/forecast/1/7/', '/api/locations/'],
+            heavy=HEAVY_MODULES,
+        )
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', script],
+            capture_output=True,
+            text=True,
+            cwd=settings.BASE_DIR,
+        )
+        if result.returncode != 0:
+            raise CommandError(result.stderr.strip().splitlines()[-1])
+
+        # Lines look like "import time:  self [us] | cumulative | imported package"
+        # Nested imports are indented, so only lines with a single leading space
+        # are counted; they are grouped by root package.
+        packages = {}
+        for line in result.stderr.splitlines():
+            if not line.startswith('import time:') or 'imported package' in line:
+                continue
+            _, cumulative_us, name = line[len('import time:'):].split('|')
+            if name.startswith('  '):
+                continue
+            root = name.strip().split('.')[0]
+            packages[root] = packages.get(root, 0) + int(cumulative_us)
+
+        total_ms = sum(packages.values()) / 1000
+        self.stdout.write(f"Total import time: {total_ms:.0f}ms")
+        for name, cumulative_us in sorted(packages.items(), key=lambda item: -item[1])[:options['top']]:
+            self.stdout.write(f"  {cumulative_us / 1000:8.1f}ms  {name}")
+
+        loaded = json.loads(result.stdout.strip().splitlines()[-1])
+        if loaded:
+            message = f"Heavy ML modules imported at startup: {', '.join(loaded)}"
+            if options['strict']:
+                raise CommandError(message)
+            self.stdout.write(self.style.WARNING(message))
+        else:
+            self.stdout.write(self.style.SUCCESS("No heavy ML modules imported at startup"))
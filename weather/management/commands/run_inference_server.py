@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from weather.services.inference_server import InferenceServer
+from weather.services.model_registry import model_registry
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the shared forecast inference server. Workers on the same host use it "
+        "with FORECAST_INFERENCE_MODE=server instead of loading their own models"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--socket', help="Unix socket path (default: FORECAST_INFERENCE_SOCKET)")
+        parser.add_argument('--window-ms', type=float, help="Micro-batch window (default: FORECAST_INFERENCE_BATCH_WINDOW_MS)")
+        parser.add_argument('--max-batch', type=int, help="Locations per batch (default: FORECAST_INFERENCE_MAX_BATCH)")
+
+    def handle(self, *args, **options):
+        # Load the serving models before accepting clients so the first requests don't pay for it
+        try:
+            model_registry.preload()
+        except OSError as e:
+            self.stdout.write(self.style.WARNING(f"No forecast model loaded, serving the fallback: {str(e)}"))
+
+        server = InferenceServer(
+            address=options['socket'],
+            window=options['window_ms'] / 1000 if options['window_ms'] is not None else None,
+            max_batch=options['max_batch'],
+        ).start()
+        self.stdout.write(self.style.SUCCESS(f"Serving forecasts on {server.address}"))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.close()
+            self.stdout.write(f"Served {server.requests} requests in {server.batches} batches")
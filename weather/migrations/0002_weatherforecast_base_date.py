@@ -0,0 +1,24 @@
+# Generated by Django 5.1.6 on 2026-10-18 05:43
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('weather', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='weatherforecast',
+            name='base_date',
+            field=models.DateField(default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AlterUniqueTogether(
+            name='weatherforecast',
+            unique_together={('location', 'base_date', 'forecast_date')},
+        ),
+    ]
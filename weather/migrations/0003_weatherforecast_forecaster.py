@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-18 06:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('weather', '0002_weatherforecast_base_date'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='weatherforecast',
+            name='forecaster',
+            field=models.CharField(default='lstm', max_length=32),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-18 06:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('weather', '0003_weatherforecast_forecaster'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='weatherforecast',
+            name='model_version',
+            field=models.CharField(blank=True, max_length=32, null=True),
+        ),
+    ]
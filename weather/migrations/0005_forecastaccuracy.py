@@ -0,0 +1,34 @@
+# Generated by Django 5.1.6 on 2026-10-18 06:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('weather', '0004_weatherforecast_model_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ForecastAccuracy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('horizon', models.PositiveSmallIntegerField()),
+                ('samples', models.IntegerField()),
+                ('mae', models.FloatField()),
+                ('rmse', models.FloatField()),
+                ('bias', models.FloatField()),
+                ('interval_coverage', models.FloatField(blank=True, null=True)),
+                ('window_start', models.DateField()),
+                ('window_end', models.DateField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='weather.location')),
+            ],
+            options={
+                'ordering': ['location', 'horizon'],
+                'unique_together': {('location', 'horizon')},
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.6 on 2026-10-18 06:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('weather', '0005_forecastaccuracy'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alertnotification',
+            name='forecast',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='weather.weatherforecast'),
+        ),
+        migrations.AlterField(
+            model_name='alertnotification',
+            name='weather_data',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='weather.weatherdata'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-18 06:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('weather', '0006_alertnotification_forecast'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='location',
+            name='last_dispatched_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,13 +1,30 @@
+import math
+
 from django.db import models
 from django.conf import settings
 from django.utils import timezone
 
 
-    
+def fetch_cell_for(latitude, longitude):
+    """
+    Grid cell (WEATHER_FETCH_CELL_DEGREES on a side) whose locations share one
+    upstream fetch. Always derived from the coordinates rather than stored, so
+    rows written by bulk_create or QuerySet.update are grouped correctly too.
+    """
+    size = settings.WEATHER_FETCH_CELL_DEGREES
+    return f"{math.floor(float(latitude) / size)}:{math.floor(float(longitude) / size)}"
+
+def fetch_cell_bounds(latitude, longitude):
+    """Latitude and longitude ranges [low, high) of the fetch cell containing a point."""
+    size = settings.WEATHER_FETCH_CELL_DEGREES
+    row, column = math.floor(float(latitude) / size), math.floor(float(longitude) / size)
+    return (row * size, (row + 1) * size), (column * size, (column + 1) * size)
+
 class Location(models.Model):
     name = models.CharField(max_length=100)
     latitude = models.FloatField()
     longitude = models.FloatField()
+    last_dispatched_at = models.DateTimeField(null=True, blank=True)  # Last handed to refresh_weather by the poller
 
     def __str__(self):
         return self.name
@@ -101,7 +118,9 @@ class AlertNotification(models.Model):
     
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     threshold = models.ForeignKey(AlertThreshold, on_delete=models.CASCADE)
-    weather_data = models.ForeignKey(WeatherData, on_delete=models.CASCADE)
+    # Observed alerts point at the reading that triggered them, predictive ones at the forecast day
+    weather_data = models.ForeignKey(WeatherData, on_delete=models.CASCADE, null=True, blank=True)
+    forecast = models.ForeignKey('WeatherForecast', on_delete=models.CASCADE, null=True, blank=True)
     message = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     is_read = models.BooleanField(default=False)
@@ -113,6 +132,7 @@ class AlertNotification(models.Model):
 class WeatherForecast(models.Model):
     location = models.ForeignKey(Location, on_delete=models.CASCADE)
     forecast_date = models.DateField()  # Forecast for a specific date
+    base_date = models.DateField()  # Last observed date the forecast was generated from
 
     # Predicted weather data
     min_temp = models.FloatField(null=True, blank=True)
@@ -121,14 +141,39 @@ class WeatherForecast(models.Model):
     avg_humidity = models.FloatField(null=True, blank=True)
     avg_wind_speed = models.FloatField(null=True, blank=True)
     description = models.CharField(max_length=200, null=True, blank=True)
+    forecaster = models.CharField(max_length=32, default='lstm')  # Model that produced the forecast
+    model_version = models.CharField(max_length=32, null=True, blank=True)  # Artifact version behind an LSTM forecast
 
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ['forecast_date']
+        unique_together = ('location', 'base_date', 'forecast_date')
         indexes = [
             models.Index(fields=['location', 'forecast_date']),
         ]
 
     def __str__(self):
-        return f"{self.location.name} forecast for {self.forecast_date}"
\ No newline at end of file
+        return f"{self.location.name} forecast for {self.forecast_date}"
+
+class ForecastAccuracy(models.Model):
+    location = models.ForeignKey(Location, on_delete=models.CASCADE)
+    horizon = models.PositiveSmallIntegerField()  # Days between the forecast's base date and the forecast day
+
+    # Errors of avg_temp over the rolling window, in degrees
+    samples = models.IntegerField()
+    mae = models.FloatField()
+    rmse = models.FloatField()
+    bias = models.FloatField()  # Mean forecast minus actual; positive means forecasts run warm
+    interval_coverage = models.FloatField(null=True, blank=True)  # Share of actuals inside min_temp..max_temp
+
+    window_start = models.DateField()
+    window_end = models.DateField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['location', 'horizon']
+        unique_together = ('location', 'horizon')
+
+    def __str__(self):
+        return f"{self.location.name} +{self.horizon}d MAE {self.mae:.2f}"
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Location, HistoricalWeatherData, WeatherData
+from .models import Location, HistoricalWeatherData, WeatherData, ForecastAccuracy
 
 class LocationSerializer(serializers.ModelSerializer):
     class Meta:
@@ -48,4 +48,14 @@ class ForecastDataSerializer(serializers.Serializer):
     date = serializers.DateField()
     temperature = serializers.FloatField()
     min_temp = serializers.FloatField()
-    max_temp = serializers.FloatField()
\ No newline at end of file
+    max_temp = serializers.FloatField()
+
+class ForecastAccuracySerializer(serializers.ModelSerializer):
+    location = serializers.CharField(source='location.name', read_only=True)
+
+    class Meta:
+        model = ForecastAccuracy
+        fields = [
+            'location_id', 'location', 'horizon', 'samples', 'mae', 'rmse', 'bias', 'interval_coverage',
+            'window_start', 'window_end', 'updated_at',
+        ]
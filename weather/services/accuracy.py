@@ -0,0 +1,126 @@
+import logging
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from weather.models import ForecastAccuracy, WeatherForecast
+
+logger = logging.getLogger(__name__)
+
+
+def load_forecast_errors(since, until):
+    """
+    Every stored forecast day in [since, until) that has been observed since,
+    joined with its HistoricalWeatherData row in one query. Returns column arrays.
+    """
+    rows = list(
+        WeatherForecast.objects
+        .filter(
+            forecast_date__gte=since,
+            forecast_date__lt=until,
+            avg_temp__isnull=False,
+            location__historicalweatherdata__date=F('forecast_date'),
+        )
+        .order_by()
+        .values_list(
+            'location_id', 'base_date', 'forecast_date', 'avg_temp', 'min_temp', 'max_temp',
+            'location__historicalweatherdata__avg_temp',
+        )
+    )
+    if not rows:
+        return None
+
+    location_ids, base_dates, forecast_dates, forecast, lower, upper, actual = zip(*rows)
+    return {
+        'location_ids': np.array(location_ids, dtype=np.int64),
+        'horizons': (
+            np.array(forecast_dates, dtype='datetime64[D]') - np.array(base_dates, dtype='datetime64[D]')
+        ).astype(np.int64),
+        'forecast': np.array(forecast, dtype=np.float64),
+        # Nullable columns come back as None, which float arrays turn into NaN
+        'lower': np.array(lower, dtype=np.float64),
+        'upper': np.array(upper, dtype=np.float64),
+        'actual': np.array(actual, dtype=np.float64),
+    }
+
+
+def accuracy_metrics(location_ids, horizons, forecast, lower, upper, actual):
+    """
+    Error metrics per (location, horizon), vectorized: rows are grouped with one
+    np.unique and every sum is a weighted bincount over the group index.
+    """
+    keys, group, counts = np.unique(
+        np.stack([location_ids, horizons], axis=1), axis=0, return_inverse=True, return_counts=True
+    )
+    group = group.ravel()
+    total = lambda values: np.bincount(group, weights=values, minlength=len(keys))
+
+    error = forecast - actual
+    has_interval = ~(np.isnan(lower) | np.isnan(upper))
+    covered = has_interval & (actual >= lower) & (actual <= upper)
+    with_interval = total(has_interval)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        coverage = np.where(with_interval > 0, total(covered) / with_interval, np.nan)
+
+    return {
+        'location_ids': keys[:, 0],
+        'horizons': keys[:, 1],
+        'samples': counts,
+        'mae': total(np.abs(error)) / counts,
+        'rmse': np.sqrt(total(np.square(error)) / counts),
+        'bias': total(error) / counts,
+        'interval_coverage': coverage,
+    }
+
+
+def update_forecast_accuracy(window_days=None, today=None):
+    """
+    Recompute rolling accuracy over the last `window_days` observed days and upsert
+    it into ForecastAccuracy; pairs without samples in the window are removed.
+    Returns the number of (location, horizon) rows written.
+    """
+    window_days = window_days or settings.FORECAST_ACCURACY_WINDOW_DAYS
+    window_end = today or timezone.now().date()
+    window_start = window_end - timedelta(days=window_days)
+    started_at = timezone.now()
+
+    errors = load_forecast_errors(window_start, window_end)
+    rows = []
+    if errors is not None:
+        metrics = accuracy_metrics(**errors)
+        coverage = metrics['interval_coverage']
+        rows = [
+            ForecastAccuracy(
+                location_id=int(location_id),
+                horizon=int(horizon),
+                samples=int(samples),
+                mae=float(mae),
+                rmse=float(rmse),
+                bias=float(bias),
+                interval_coverage=None if np.isnan(coverage[i]) else float(coverage[i]),
+                window_start=window_start,
+                window_end=window_end,
+            )
+            for i, (location_id, horizon, samples, mae, rmse, bias) in enumerate(zip(
+                metrics['location_ids'], metrics['horizons'], metrics['samples'],
+                metrics['mae'], metrics['rmse'], metrics['bias'],
+            ))
+        ]
+
+    ForecastAccuracy.objects.bulk_create(
+        rows,
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=['location', 'horizon'],
+        update_fields=[
+            'samples', 'mae', 'rmse', 'bias', 'interval_coverage', 'window_start', 'window_end', 'updated_at',
+        ],
+    )
+    # Anything not rewritten above had no observed forecasts in the window
+    pruned, _ = ForecastAccuracy.objects.filter(updated_at__lt=started_at).delete()
+
+    logger.info(f"Forecast accuracy: {len(rows)} location/horizon pairs updated, {pruned} pruned")
+    return len(rows)
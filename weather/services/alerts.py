@@ -0,0 +1,154 @@
+import logging
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.core.mail import send_mass_mail
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from weather.models import AlertNotification, AlertThreshold, WeatherForecast
+
+logger = logging.getLogger(__name__)
+
+# Forecast column each alert condition is checked against; forecasts carry no
+# precipitation, so rain_above only fires on observed data.
+FORECAST_FIELDS = ['avg_temp', 'avg_wind_speed', 'avg_humidity']
+CONDITIONS = {
+    # condition: (forecast field, direction, label, unit)
+    'temp_above': ('avg_temp', 1, "Temperature", "°C"),
+    'temp_below': ('avg_temp', -1, "Temperature", "°C"),
+    'wind_above': ('avg_wind_speed', 1, "Wind speed", "m/s"),
+    'humidity_above': ('avg_humidity', 1, "Humidity", "%"),
+    'humidity_below': ('avg_humidity', -1, "Humidity", "%"),
+}
+
+
+def load_upcoming_forecasts(today, days):
+    """
+    The next `days` days of every location's newest stored forecast run, in one
+    query. Returns (forecast ids, location ids, dates, values of shape (rows, fields)).
+    """
+    newest_run = (
+        WeatherForecast.objects.filter(location=OuterRef('location'))
+        .order_by('-base_date').values('base_date')[:1]
+    )
+    rows = list(
+        WeatherForecast.objects
+        .filter(forecast_date__gt=today, forecast_date__lte=today + timedelta(days=days), base_date=Subquery(newest_run))
+        .order_by()
+        .values_list('id', 'location_id', 'forecast_date', *FORECAST_FIELDS)
+    )
+    if not rows:
+        return None
+    ids, location_ids, dates, *values = zip(*rows)
+    return np.array(ids), np.array(location_ids), np.array(dates, dtype='datetime64[D]'), np.array(values, dtype=np.float64).T
+
+
+def evaluate_thresholds(forecast_locations, forecast_dates, values, today, days,
+                        threshold_locations, fields, directions, limits):
+    """
+    Compare every threshold with every upcoming forecast day of its location at once.
+
+    Forecast rows are scattered into a dense (locations, days, fields) grid, each
+    threshold gathers its (days,) series from it and one signed comparison gives
+    the (thresholds, days) trigger matrix. Returns, per threshold, the index of
+    the first triggering day or -1.
+    """
+    locations, location_index = np.unique(forecast_locations, return_inverse=True)
+    day_index = (forecast_dates - np.datetime64(today)).astype(np.int64) - 1
+    grid = np.full((len(locations), days, values.shape[1]), np.nan)
+    grid[location_index.ravel(), day_index] = values
+
+    # Thresholds for locations without an upcoming forecast see an all-NaN series
+    positions = np.searchsorted(locations, threshold_locations).clip(max=len(locations) - 1)
+    has_forecast = locations[positions] == threshold_locations
+    series = grid[positions, :, fields]  # (thresholds, days)
+
+    with np.errstate(invalid='ignore'):
+        triggered = (directions[:, None] * (series - limits[:, None]) > 0) & has_forecast[:, None]
+    first_day = triggered.argmax(axis=1)
+    return np.where(triggered.any(axis=1), first_day, -1)
+
+
+def check_forecast_alerts(days=None, today=None):
+    """
+    Raise AlertNotifications for active thresholds that the stored forecasts
+    expect to be crossed within the next `days` days (ALERT_FORECAST_DAYS).
+
+    Two reads (forecasts, thresholds), one for existing notifications, one
+    bulk_create and one mass email connection, whatever the number of thresholds.
+    Each threshold is notified once per forecast day. Returns the number created.
+    """
+    days = days or settings.ALERT_FORECAST_DAYS
+    today = today or timezone.now().date()
+    forecasts = load_upcoming_forecasts(today, days)
+    if forecasts is None:
+        return 0
+    forecast_ids, forecast_locations, forecast_dates, values = forecasts
+
+    thresholds = list(
+        AlertThreshold.objects
+        .filter(is_active=True, condition__in=CONDITIONS, location_id__in=set(forecast_locations.tolist()))
+        .values_list('id', 'user_id', 'location_id', 'condition', 'threshold_value', 'user__email', 'location__name')
+    )
+    if not thresholds:
+        return 0
+    threshold_ids, user_ids, threshold_locations, conditions, limits, emails, names = zip(*thresholds)
+
+    first_day = evaluate_thresholds(
+        forecast_locations, forecast_dates, values, today, days,
+        threshold_locations=np.array(threshold_locations),
+        fields=np.array([FORECAST_FIELDS.index(CONDITIONS[c][0]) for c in conditions]),
+        directions=np.array([CONDITIONS[c][1] for c in conditions]),
+        limits=np.array(limits, dtype=np.float64),
+    )
+    triggered = np.flatnonzero(first_day >= 0)
+    if not len(triggered):
+        return 0
+
+    # Forecast row of each (location, day), to link and dedupe notifications
+    row_of = {
+        (location_id, date): (forecast_id, row)
+        for row, (forecast_id, location_id, date) in enumerate(zip(
+            forecast_ids.tolist(), forecast_locations.tolist(), forecast_dates.tolist()
+        ))
+    }
+    already_sent = set(
+        AlertNotification.objects
+        .filter(threshold_id__in=[threshold_ids[t] for t in triggered], forecast__forecast_date__gt=today)
+        .values_list('threshold_id', 'forecast__forecast_date')
+    )
+
+    notifications = []
+    emails_to_send = []
+    for t in triggered:
+        date = today + timedelta(days=int(first_day[t]) + 1)
+        if (threshold_ids[t], date) in already_sent:
+            continue
+        forecast_id, row = row_of[(threshold_locations[t], date)]
+        field, direction, label, unit = CONDITIONS[conditions[t]]
+        value = round(float(values[row, FORECAST_FIELDS.index(field)]), 1)
+        comparison = "exceeds" if direction > 0 else "is below"
+        message = (
+            f"{label} is forecast to be {value}{unit} in {names[t]} on {date:%A, %B %d}, "
+            f"which {comparison} your threshold of {limits[t]}{unit}"
+        )
+        notifications.append(AlertNotification(
+            user_id=user_ids[t],
+            threshold_id=threshold_ids[t],
+            forecast_id=forecast_id,
+            message=message,
+            sent_email=bool(emails[t]),
+        ))
+        if emails[t]:
+            emails_to_send.append((
+                f"Weather Alert for {names[t]}", message, settings.DEFAULT_FROM_EMAIL, [emails[t]]
+            ))
+
+    AlertNotification.objects.bulk_create(notifications, batch_size=500)
+    if emails_to_send:
+        send_mass_mail(emails_to_send, fail_silently=True)
+
+    logger.info(f"Forecast alerts: {len(notifications)} notifications from {len(thresholds)} thresholds")
+    return len(notifications)
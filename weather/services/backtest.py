@@ -0,0 +1,171 @@
+import logging
+import time
+
+import numpy as np
+from django.conf import settings
+
+from weather.services.dataset import HistoricalDataset
+from weather.services.forecast_service import FEATURES, SEQUENCE_LENGTH, ForecastService
+from weather.services.model_registry import model_registry
+from weather.services.statistical import STATISTICAL_FORECASTERS
+
+logger = logging.getLogger(__name__)
+
+TEMPERATURE = FEATURES.index('avg_temp')
+
+
+class Backtest:
+    """
+    Rolling-origin backtest over the memory-mapped training dataset.
+
+    Every origin is a point in a location's history with SEQUENCE_LENGTH days
+    before it and `horizon` observed days after it. Forecasters are evaluated on
+    all origins at once: inputs and actuals are strided views, predictions come
+    back as an (origins, horizon) array and errors are computed in one pass.
+    """
+
+    def __init__(self, horizon=7, origins=30, stride=1, since=None, dataset=None):
+        self.horizon = horizon
+        self.dataset = dataset or HistoricalDataset().load()
+        self.inputs, self.targets = self.dataset.windows(SEQUENCE_LENGTH, horizon)
+
+        indices = self.dataset.window_indices(SEQUENCE_LENGTH, horizon)
+        if since is not None:
+            # Only origins whose first forecast day is on or after `since`, e.g. unseen by the model
+            first_day = self.dataset.dates[indices + SEQUENCE_LENGTH]
+            indices = indices[first_day >= np.datetime64(since)]
+        self.indices = self._latest_per_location(indices, origins, stride)
+        self.location_ids = np.asarray(self.dataset.location_ids[self.indices])
+        self.actuals = np.asarray(self.targets[self.indices][:, :, TEMPERATURE])
+
+    def _latest_per_location(self, indices, origins, stride):
+        """The newest `origins` origins of every location, `stride` days apart."""
+        if not len(indices):
+            return indices
+        owners = self.dataset.location_ids[indices]
+        _, starts, counts = np.unique(owners, return_index=True, return_counts=True)
+        # Rank 0 is each location's newest origin
+        rank_from_end = np.repeat(starts + counts - 1, counts) - np.arange(len(indices))
+        keep = (rank_from_end % stride == 0) & (rank_from_end < origins * stride)
+        return indices[keep]
+
+    def subset(self, per_location):
+        """Positions (into self.indices) of each location's newest `per_location` origins."""
+        _, starts, counts = np.unique(self.location_ids, return_index=True, return_counts=True)
+        rank_from_end = np.repeat(starts + counts - 1, counts) - np.arange(len(self.indices))
+        return np.flatnonzero(rank_from_end < per_location)
+
+    def score(self, name, predictions, positions, elapsed, latencies):
+        """MAE/RMSE per horizon day plus latency percentiles and throughput."""
+        errors = np.asarray(predictions, dtype=np.float64) - self.actuals[positions]
+        return {
+            'forecaster': name,
+            'origins': len(positions),
+            'mae': np.abs(errors).mean(axis=0),
+            'rmse': np.sqrt(np.square(errors).mean(axis=0)),
+            'p50_ms': np.percentile(latencies, 50) * 1000 if len(latencies) else None,
+            'p99_ms': np.percentile(latencies, 99) * 1000 if len(latencies) else None,
+            'throughput': len(positions) / elapsed if elapsed else None,
+        }
+
+    def run_persistence(self):
+        """Baseline: tomorrow and every later day look like the last observed day."""
+        positions = np.arange(len(self.indices))
+        start = time.perf_counter()
+        last = self.inputs[self.indices][:, -1, TEMPERATURE]
+        predictions = np.repeat(last[:, None], self.horizon, axis=1)
+        elapsed = time.perf_counter() - start
+        return self.score('persistence', predictions, positions, elapsed, [elapsed / max(len(positions), 1)])
+
+    def run_statistical(self, name, latency_samples=50):
+        """One of the fallback forecasters in weather/services/statistical.py, on every origin at once."""
+        forecaster = STATISTICAL_FORECASTERS[name]()
+        positions = np.arange(len(self.indices))
+        windows = self.inputs[self.indices]
+
+        start = time.perf_counter()
+        predictions = forecaster.forecast(windows, self.horizon)[:, :, TEMPERATURE]
+        elapsed = time.perf_counter() - start
+
+        latencies = []
+        for position in np.random.default_rng(0).permutation(positions)[:latency_samples]:
+            call_start = time.perf_counter()
+            forecaster.forecast(windows[position][None], self.horizon)
+            latencies.append(time.perf_counter() - call_start)
+
+        return self.score(name, predictions, positions, elapsed, latencies)
+
+    def _predict_lstm(self, service, windows, seed=0):
+        """Temperatures the served forecast would show: the MC dropout mean when the artifact samples."""
+        input_scaled = service.scale_windows(windows)
+        if service.metadata.get('dropout'):
+            draws = service.predict_sequences(input_scaled, self.horizon, samples=settings.FORECAST_MC_SAMPLES,
+                                              rng=np.random.default_rng(seed))
+            return draws.mean(axis=1)[:, :, TEMPERATURE]
+        return service.predict_sequences(input_scaled, self.horizon)[:, :, TEMPERATURE]
+
+    def run_lstm(self, latency_samples=50):
+        """
+        ForecastService on every origin: one batched forward pass per artifact for
+        throughput, then single-origin calls for per-request latency. Artifacts
+        trained with dropout are scored on a fixed-seed Monte Carlo mean, as served.
+        """
+        service = ForecastService()
+        positions = np.arange(len(self.indices))
+        artifacts = np.array([model_registry.resolve_artifact(int(loc)) or '' for loc in self.location_ids])
+        predictions = np.empty((len(positions), self.horizon), dtype=np.float64)
+
+        # Load every artifact up front so the timings below measure inference only
+        for artifact_dir in np.unique(artifacts):
+            service.load_lstm_model(artifact_dir or None)
+
+        start = time.perf_counter()
+        for artifact_dir in np.unique(artifacts):
+            group = np.flatnonzero(artifacts == artifact_dir)
+            service.load_lstm_model(artifact_dir or None)
+            predictions[group] = self._predict_lstm(service, self.inputs[self.indices[group]])
+        elapsed = time.perf_counter() - start
+
+        latencies = []
+        sample = np.random.default_rng(0).permutation(positions)[:latency_samples]
+        for position in sample:
+            call_start = time.perf_counter()
+            service.load_lstm_model(artifacts[position] or None)
+            self._predict_lstm(service, self.inputs[self.indices[position]][None])
+            latencies.append(time.perf_counter() - call_start)
+
+        return self.score('lstm', predictions, positions, elapsed, latencies)
+
+    def run_prophet(self, per_location=2):
+        """
+        The Prophet path of weather/api.py refitted at every origin. Fits are slow,
+        so only each location's newest `per_location` origins are evaluated.
+        """
+        from weather.api import WeatherForecastAPIView
+
+        view = WeatherForecastAPIView()
+        positions = self.subset(per_location)
+        predictions = np.full((len(positions), self.horizon), np.nan)
+        latencies = []
+
+        for row, position in enumerate(positions):
+            index = self.indices[position]
+            location_id = int(self.location_ids[position])
+            # Everything this location observed up to the origin
+            first = int(np.searchsorted(self.dataset.location_ids, location_id))
+            end = index + SEQUENCE_LENGTH
+            history = [
+                {'date': date.item(), 'avg_temp': float(temp)}
+                for date, temp in zip(self.dataset.dates[first:end], self.dataset.features[first:end, TEMPERATURE])
+            ]
+
+            call_start = time.perf_counter()
+            forecast = view.forecast_from_history(location_id, history, self.horizon, use_cache=False)
+            latencies.append(time.perf_counter() - call_start)
+            if forecast:
+                predictions[row] = [day['temperature'] for day in forecast]
+
+        # Origins with too little history for Prophet are left out of its scores
+        scored = ~np.isnan(predictions).any(axis=1)
+        elapsed = sum(latencies)
+        return self.score('prophet', predictions[scored], positions[scored], elapsed, latencies)
@@ -0,0 +1,188 @@
+import json
+import logging
+import os
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Count, Max, Sum
+from numpy.lib.stride_tricks import sliding_window_view
+
+from weather.models import HistoricalWeatherData
+from weather.services.forecast_service import FEATURES
+
+logger = logging.getLogger(__name__)
+
+
+class HistoricalDataset:
+    """
+    Training data stage for the forecast model.
+
+    HistoricalWeatherData is streamed from the database in chunks into compact
+    float32 .npy files under FORECAST_DATASET_DIR, ordered by (location, date),
+    and memory-mapped on later runs while the table is unchanged. Training
+    windows are zero-copy strided views over that file; only the current batch
+    is ever materialized, so memory stays flat as history grows.
+    """
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir or settings.FORECAST_DATASET_DIR
+        self.features = None
+        self.location_ids = None
+        self.dates = None
+
+    def _path(self, name):
+        return os.path.join(self.cache_dir, name)
+
+    def _fingerprint(self):
+        # Row count and newest id catch inserts and deletes; the latest date and
+        # per-column sums catch rows that were updated in place
+        stats = HistoricalWeatherData.objects.aggregate(
+            rows=Count('id'), max_id=Max('id'), last_date=Max('date'), location_sum=Sum('location_id'),
+            **{f'{name}_sum': Sum(name) for name in FEATURES},
+        )
+        stats['last_date'] = stats['last_date'] and stats['last_date'].isoformat()
+        return stats
+
+    @property
+    def rows(self):
+        return 0 if self.features is None else self.features.shape[0]
+
+    def load(self, rebuild=False):
+        """Memory-map the cached arrays, rebuilding them first if the table changed."""
+        fingerprint = self._fingerprint()
+        try:
+            with open(self._path('meta.json')) as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            cached = None
+
+        if rebuild or cached != fingerprint:
+            self.build(fingerprint)
+        return self.open()
+
+    def open(self):
+        """Memory-map the cached arrays as they are, without checking the database."""
+        self.features = np.load(self._path('features.npy'), mmap_mode='r')
+        self.location_ids = np.load(self._path('location_ids.npy'), mmap_mode='r')
+        self.dates = np.load(self._path('dates.npy'), mmap_mode='r')
+        return self
+
+    def build(self, fingerprint=None, chunk_size=10000):
+        fingerprint = fingerprint or self._fingerprint()
+        rows = fingerprint['rows']
+        os.makedirs(self.cache_dir, exist_ok=True)
+        logger.info(f"Building training dataset cache from {rows} history rows")
+
+        # Write to temporary files and swap them in, so a failed build never leaves a torn cache
+        names = ['features.npy', 'location_ids.npy', 'dates.npy']
+        tmp_paths = {name: self._path(f"{name}.tmp") for name in names}
+        features = np.lib.format.open_memmap(tmp_paths['features.npy'], mode='w+', dtype=np.float32, shape=(rows, len(FEATURES)))
+        location_ids = np.lib.format.open_memmap(tmp_paths['location_ids.npy'], mode='w+', dtype=np.int64, shape=(rows,))
+        dates = np.lib.format.open_memmap(tmp_paths['dates.npy'], mode='w+', dtype='datetime64[D]', shape=(rows,))
+
+        queryset = (
+            HistoricalWeatherData.objects.filter(id__lte=fingerprint['max_id'] or 0)
+            .order_by('location_id', 'date')
+            .values_list('location_id', 'date', *FEATURES)
+        )
+
+        written = 0
+        chunk = []
+        for row in queryset.iterator(chunk_size=chunk_size):
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                written = self._write_chunk(chunk, written, features, location_ids, dates)
+                chunk = []
+        if chunk:
+            written = self._write_chunk(chunk, written, features, location_ids, dates)
+
+        for array in (features, location_ids, dates):
+            array.flush()
+        del features, location_ids, dates
+
+        for name in names:
+            os.replace(tmp_paths[name], self._path(name))
+        with open(self._path('meta.json'), 'w') as f:
+            json.dump({**fingerprint, 'rows': written}, f)
+
+    def _write_chunk(self, chunk, offset, features, location_ids, dates):
+        end = offset + len(chunk)
+        columns = list(zip(*chunk))
+        location_ids[offset:end] = columns[0]
+        dates[offset:end] = np.array(columns[1], dtype='datetime64[D]')
+        features[offset:end] = np.array(columns[2:], dtype=np.float32).T
+        return end
+
+    def location_slices(self):
+        """{location_id: (start, end)} row ranges; each location's history is contiguous."""
+        location_ids, starts, counts = np.unique(self.location_ids, return_index=True, return_counts=True)
+        return {
+            int(location_id): (int(start), int(start + count))
+            for location_id, start, count in zip(location_ids, starts, counts)
+        }
+
+    def date_range(self, start=0, end=None):
+        dates = self.dates[start:end]
+        return str(dates.min()), str(dates.max())
+
+    def fit_scaler(self, start=0, end=None, chunk_size=100000):
+        from sklearn.preprocessing import MinMaxScaler
+
+        end = self.rows if end is None else end
+        scaler = MinMaxScaler()
+        for offset in range(start, end, chunk_size):
+            scaler.partial_fit(self.features[offset:min(offset + chunk_size, end)])
+        return scaler
+
+    def window_indices(self, seq_length, steps_ahead=1, start=0, end=None):
+        """
+        Start offsets of every window (seq_length inputs + steps_ahead targets)
+        that stays inside a single location's history, optionally limited to
+        the rows in [start, end).
+        """
+        end = self.rows if end is None else end
+        span = seq_length + steps_ahead
+        if end - start < span:
+            return np.empty(0, dtype=np.int64)
+        # Rows are sorted by location, so a window is valid iff its first and last rows match
+        first = self.location_ids[start:end - span + 1]
+        last = self.location_ids[start + span - 1:end]
+        return np.flatnonzero(first == last) + start
+
+    def split(self, indices, validation_fraction=0.1):
+        """
+        Hold out the most recent `validation_fraction` of each location's windows,
+        so validation always scores forecasts of days the model didn't train on.
+        """
+        owners = self.location_ids[indices]
+        _, starts, counts = np.unique(owners, return_index=True, return_counts=True)
+        rank = np.arange(len(indices)) - np.repeat(starts, counts)
+        cutoff = np.repeat(counts - np.ceil(counts * validation_fraction).astype(np.int64), counts)
+        held_out = rank >= cutoff
+        return indices[~held_out], indices[held_out]
+
+    def windows(self, seq_length, steps_ahead=1):
+        """Zero-copy views: inputs (n, seq_length, F) and targets (n, steps_ahead, F) by start offset."""
+        inputs = sliding_window_view(self.features, seq_length, axis=0).transpose(0, 2, 1)
+        targets = sliding_window_view(self.features[seq_length:], steps_ahead, axis=0).transpose(0, 2, 1)
+        return inputs, targets
+
+    def batches(self, indices, scaler, seq_length, horizon=None, batch_size=16, shuffle=True, seed=0):
+        """
+        Endless generator of scaled (X, y) batches for Keras. y is the next day's
+        temperature, or the next `horizon` days of every feature in direct mode.
+        """
+        steps_ahead = horizon or 1
+        inputs, targets = self.windows(seq_length, steps_ahead)
+        scale = scaler.scale_.astype(np.float32)
+        offset = scaler.min_.astype(np.float32)
+        rng = np.random.default_rng(seed)
+
+        while True:
+            order = rng.permutation(indices) if shuffle else indices
+            for start in range(0, len(order), batch_size):
+                # Sorted fancy indexing reads the memmap sequentially; only this batch is copied
+                idx = np.sort(order[start:start + batch_size])
+                X = inputs[idx] * scale + offset
+                y = targets[idx] * scale + offset
+                yield X, (y if horizon else y[:, 0, 0])
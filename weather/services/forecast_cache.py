@@ -0,0 +1,119 @@
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
+
+from weather.models import HistoricalWeatherData
+from weather.services.model_registry import model_registry
+
+logger = logging.getLogger(__name__)
+
+HITS_KEY = 'forecast_cache_hits'
+MISSES_KEY = 'forecast_cache_misses'
+
+
+class ForecastCache:
+    """
+    Cache of finished forecasts keyed by (location, latest historical date,
+    model version, days). A forecast only depends on the last observed days and
+    the model artifact, so it can be reused until either of them changes.
+
+    Hit/miss counts are kept in process and added to the shared counters at most
+    every FORECAST_CACHE_STATS_FLUSH_SECONDS, so a read costs no extra cache
+    round trips for statistics.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {HITS_KEY: 0, MISSES_KEY: 0}
+        self._flushed_at = time.monotonic()
+
+    def _latest_date_key(self, location_id):
+        return f"forecast_latest_date_{location_id}"
+
+    def _generation_key(self, location_id):
+        return f"forecast_generation_{location_id}"
+
+    def _incr(self, key, delta=1):
+        # cache.incr raises for missing keys, so seed the counter first
+        cache.add(key, 0, timeout=None)
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            pass
+
+    def _count(self, key):
+        with self._lock:
+            self._pending[key] += 1
+            due = time.monotonic() - self._flushed_at >= settings.FORECAST_CACHE_STATS_FLUSH_SECONDS
+        if due:
+            self.flush_stats()
+
+    def flush_stats(self):
+        """Add this process's pending hit/miss counts to the shared counters."""
+        with self._lock:
+            pending = {key: count for key, count in self._pending.items() if count}
+            self._pending = {HITS_KEY: 0, MISSES_KEY: 0}
+            self._flushed_at = time.monotonic()
+        for key, count in pending.items():
+            self._incr(key, count)
+
+    def _location_state(self, location_id):
+        latest_key = self._latest_date_key(location_id)
+        generation_key = self._generation_key(location_id)
+        state = cache.get_many([latest_key, generation_key])
+
+        latest_date = state.get(latest_key)
+        if latest_date is None:
+            latest = HistoricalWeatherData.objects.filter(
+                location_id=location_id
+            ).aggregate(latest=Max('date'))['latest']
+            latest_date = latest.isoformat() if latest else 'none'
+            cache.set(latest_key, latest_date, settings.FORECAST_CACHE_TTL)
+
+        return latest_date, state.get(generation_key, 0)
+
+    def make_key(self, location_id, days):
+        latest_date, generation = self._location_state(location_id)
+        return (
+            f"forecast_{location_id}_{latest_date}_{model_registry.model_version()}"
+            f"_{days}_{generation}"
+        )
+
+    def get_or_compute(self, location, days, compute):
+        """Return the cached forecast for `location`, calling `compute()` on a miss."""
+        key = self.make_key(location.id, days)
+        forecast_data = cache.get(key)
+        if forecast_data is not None:
+            self._count(HITS_KEY)
+            return forecast_data
+
+        self._count(MISSES_KEY)
+        forecast_data = compute()
+        cache.set(key, forecast_data, settings.FORECAST_CACHE_TTL)
+        return forecast_data
+
+    def invalidate(self, location_id):
+        """Drop cached forecasts for a location after its history changed."""
+        cache.delete(self._latest_date_key(location_id))
+        self._incr(self._generation_key(location_id))
+        logger.debug(f"Invalidated cached forecasts for location {location_id}")
+
+    def stats(self):
+        """Shared hit/miss counts, including this process's unflushed ones."""
+        self.flush_stats()
+        counters = cache.get_many([HITS_KEY, MISSES_KEY])
+        hits = counters.get(HITS_KEY, 0)
+        misses = counters.get(MISSES_KEY, 0)
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': hits / total if total else 0.0,
+        }
+
+
+forecast_cache = ForecastCache()
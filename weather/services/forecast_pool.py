@@ -0,0 +1,129 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+class ForecastUnavailable(Exception):
+    """The forecast could not be computed in time; callers should degrade gracefully."""
+
+
+class ForecastPoolSaturated(ForecastUnavailable):
+    pass
+
+
+class ForecastTimeout(ForecastUnavailable):
+    pass
+
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+# Entry points executed inside pool workers. They take ids rather than model
+# instances so arguments stay small and picklable.
+
+def lstm_forecast(location_id, days):
+    from weather.models import Location
+    from weather.services.forecast_service import ForecastService
+
+    location = Location.objects.get(pk=location_id)
+    return ForecastService().generate_forecast(location, days)
+
+
+def prophet_forecast(location_id, days):
+    from weather.api import WeatherForecastAPIView
+    from weather.models import Location
+
+    location = Location.objects.get(pk=location_id)
+    return WeatherForecastAPIView().generate_forecast(location, days)
+
+
+def _in_thread(fn, *args):
+    try:
+        return fn(*args)
+    finally:
+        # Pool threads outlive the job; don't leave their database connections open
+        connections.close_all()
+
+
+class ForecastPool:
+    """
+    Bounded process pool for CPU-bound forecast work (LSTM inference, Prophet fits).
+
+    Keeps that work off the request threads so a few slow forecasts can't tie up
+    every web worker. At most FORECAST_POOL_MAX_QUEUE jobs may be queued or running;
+    beyond that, and past the per-request deadline, callers get ForecastUnavailable.
+
+    With threads=True the jobs run on threads of the calling process instead, so
+    they use the models that process already holds (FORECAST_INFERENCE_MODE='local')
+    under the same limits.
+    """
+
+    def __init__(self, threads=False):
+        self.threads = threads
+        self._lock = threading.Lock()
+        self._executor = None
+        self._slots = None
+        self._pid = None
+
+    def _get_executor(self):
+        with self._lock:
+            # Executors don't survive a fork, so each worker process builds its own
+            if self._executor is None or self._pid != os.getpid():
+                if self.threads:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=settings.FORECAST_POOL_WORKERS, thread_name_prefix='forecast'
+                    )
+                else:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=settings.FORECAST_POOL_WORKERS,
+                        mp_context=multiprocessing.get_context(settings.FORECAST_POOL_START_METHOD),
+                        initializer=_init_worker,
+                    )
+                self._slots = threading.BoundedSemaphore(settings.FORECAST_POOL_MAX_QUEUE)
+                self._pid = os.getpid()
+            return self._executor, self._slots
+
+    def _reset(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def run(self, fn, *args, timeout=None):
+        executor, slots = self._get_executor()
+        if not slots.acquire(blocking=False):
+            logger.warning(f"Forecast pool saturated, rejecting {fn.__name__}{args}")
+            raise ForecastPoolSaturated("Forecast workers are busy")
+
+        try:
+            future = executor.submit(_in_thread, fn, *args) if self.threads else executor.submit(fn, *args)
+        except BrokenProcessPool as e:
+            slots.release()
+            self._reset()
+            raise ForecastPoolSaturated("Forecast workers are restarting") from e
+        # The slot is held until the job really finishes, even if the caller gave up on it
+        future.add_done_callback(lambda _: slots.release())
+
+        try:
+            return future.result(timeout=timeout or settings.FORECAST_DEADLINE_SECONDS)
+        except FuturesTimeoutError as e:
+            future.cancel()
+            logger.warning(f"Forecast {fn.__name__}{args} missed its deadline")
+            raise ForecastTimeout("Forecast took too long") from e
+        except BrokenProcessPool as e:
+            self._reset()
+            raise ForecastPoolSaturated("Forecast worker crashed") from e
+
+
+forecast_pool = ForecastPool()
+local_forecast_pool = ForecastPool(threads=True)
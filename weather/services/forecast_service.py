@@ -1,25 +1,51 @@
-import pandas as pd
+import logging
+import time
 import numpy as np
 from datetime import timedelta
-import os
-import joblib
 from django.conf import settings
-from weather.models import HistoricalWeatherData  # adjust import paths
-from tensorflow.keras.models import load_model
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+from weather.models import HistoricalWeatherData, WeatherForecast  # adjust import paths
+from weather.services.forecast_cache import forecast_cache
+from weather.services.forecast_pool import ForecastUnavailable, forecast_pool, local_forecast_pool, lstm_forecast
+from weather.services.inference_server import inference_client
+from weather.services.model_registry import model_registry
+from weather.services.statistical import get_fallback_forecaster
+
+logger = logging.getLogger(__name__)
+
+FEATURES = ['avg_temp', 'avg_humidity', 'avg_wind_speed', 'total_precip_mm']
+SEQUENCE_LENGTH = 30
+
 
 class ForecastService:
     def __init__(self):
         self.lstm_model = None
         self.scaler = None
+        self.metadata = None
 
-    def load_lstm_model(self):
-        model_path = os.path.join(settings.BASE_DIR, 'weather_forecast_lstm.h5')
-        scaler_path = os.path.join(settings.BASE_DIR, 'weather_scaler.save')
-
-        self.lstm_model = load_model(model_path, compile=False)
-        self.scaler = joblib.load(scaler_path)
+    def load_lstm_model(self, artifact_dir=None):
+        # Served from the process-wide registry; only the first call per process hits disk
+        self.lstm_model = model_registry.get_lstm_model(artifact_dir=artifact_dir)
+        self.scaler = model_registry.get_scaler(artifact_dir)
+        self.metadata = model_registry.get_model_metadata(artifact_dir)
     pass
 
+    def warm_up(self, days=7):
+        """
+        Push one dummy window through the forward pass (MC sampling included) so
+        a fresh process's first real forecast isn't the slow one.
+        Returns the elapsed seconds.
+        """
+        start = time.perf_counter()
+        self.load_lstm_model(model_registry.resolve_artifact())
+        # Mid-range in scaled units, i.e. a plausible window for any scaler
+        window = np.full((1, SEQUENCE_LENGTH, len(FEATURES)), 0.5, dtype=np.float32)
+        samples = settings.FORECAST_MC_SAMPLES if self.metadata.get('dropout') else None
+        self.predict_sequences(window, days, samples=samples)
+        return time.perf_counter() - start
+
     def get_weather_description(self, temp):
         if temp > 30:
             return "Sunny"
@@ -39,41 +65,372 @@ class ForecastService:
             return "Freezing"
     pass
 
+    def load_history_windows(self, locations):
+        """
+        Fetch the last SEQUENCE_LENGTH days of history for every location in one query.
+        Returns {location_id: (last_date, array of shape (days, 4))}; days is below
+        SEQUENCE_LENGTH for locations with a short history.
+        """
+        rows = (
+            HistoricalWeatherData.objects.filter(location__in=locations)
+            .annotate(row_number=Window(
+                RowNumber(),
+                partition_by=F('location_id'),
+                order_by=F('date').desc(),
+            ))
+            .filter(row_number__lte=SEQUENCE_LENGTH)
+            .order_by('location_id', 'date')
+            .values_list('location_id', 'date', *FEATURES)
+        )
+
+        grouped = {}
+        for location_id, date, *values in rows:
+            grouped.setdefault(location_id, ([], []))
+            grouped[location_id][0].append(date)
+            grouped[location_id][1].append(values)
+
+        return {
+            location_id: (dates[-1], np.asarray(values, dtype=np.float32))
+            for location_id, (dates, values) in grouped.items()
+        }
+
+    def predict_sequences(self, input_scaled, days, samples=None, rng=None):
+        """
+        Forecast `days` steps for a batch of scaled windows of shape (N, SEQUENCE_LENGTH, 4),
+        running one forward pass for the whole batch at a time.
+
+        Autoregressive models predict the next day's temperature per pass (other
+        features are carried forward); direct models predict every feature for
+        their whole horizon in one pass. Returns real-unit features, shape (N, days, 4).
+
+        With `samples`, every window is repeated K times and run with dropout active,
+        still as one (N * K, SEQUENCE_LENGTH, 4) forward pass per step; each sample
+        feeds back its own predictions. Returns shape (N, K, days, 4). Pass a seeded
+        `rng` (numpy models only) for reproducible samples.
+        """
+        if samples and hasattr(self.lstm_model, 'encode'):
+            return self._sample_sequences(input_scaled, days, samples, rng)
+
+        direct = self.metadata['mode'] == 'direct'
+        current_input = np.array(input_scaled, dtype=np.float32)
+        windows = current_input.shape[0]
+        if samples:
+            current_input = np.repeat(current_input, samples, axis=0)
+        batch_size = current_input.shape[0]
+        predictions = np.empty((batch_size, days, len(FEATURES)), dtype=np.float32)
+
+        step = 0
+        while step < days:
+            if samples:
+                # Keras models and NumpyLSTMModel both sample dropout masks when called with training=True
+                output = np.asarray(self.lstm_model(current_input, training=True), dtype=np.float32)
+            else:
+                output = self.lstm_model.predict(current_input, batch_size=batch_size, verbose=0)
+            if direct:
+                next_features = np.asarray(output, dtype=np.float32).reshape(batch_size, -1, len(FEATURES))
+            else:
+                next_features = current_input[:, -1:, :].copy()
+                next_features[:, 0, 0] = output[:, 0]
+            next_features = next_features[:, :days - step]
+            count = next_features.shape[1]
+            predictions[:, step:step + count] = next_features
+            step += count
+
+            # Slide every window forward, feeding back the predicted days
+            current_input = np.concatenate((current_input[:, count:, :], next_features), axis=1)
+
+        predictions = self.scaler.inverse_transform(
+            predictions.reshape(-1, len(FEATURES))
+        )
+        if samples:
+            return predictions.reshape(windows, samples, days, len(FEATURES))
+        return predictions.reshape(batch_size, days, len(FEATURES))
+
+    def _sample_sequences(self, input_scaled, days, samples, rng=None):
+        """
+        predict_sequences(samples=K) for models exposing encode()/head() (NumpyLSTMModel).
+
+        At every step the part of a window that is still observed history is the
+        same for all K samples, so it is encoded once per location; only the
+        sampled days are run for N * K rows. This keeps K samples close to the
+        cost of a single deterministic forecast.
+        """
+        direct = self.metadata['mode'] == 'direct'
+        # One Generator per call, never shared between concurrently running requests
+        rng = rng or np.random.default_rng()
+        history = np.asarray(input_scaled, dtype=np.float32)
+        windows = history.shape[0]
+        sampled = np.empty((windows * samples, days, len(FEATURES)), dtype=np.float32)
+
+        step = 0
+        while step < days:
+            state = None
+            if step < SEQUENCE_LENGTH:
+                h, c = self.lstm_model.encode(history[:, step:, :])
+                state = (np.repeat(h, samples, axis=0), np.repeat(c, samples, axis=0))
+            if step:
+                h, _ = self.lstm_model.encode(sampled[:, max(0, step - SEQUENCE_LENGTH):step, :], state)
+            else:
+                h = state[0]
+            output = self.lstm_model.head(h, training=True, rng=rng)
+
+            if direct:
+                next_features = np.asarray(output, dtype=np.float32).reshape(windows * samples, -1, len(FEATURES))
+            else:
+                last_day = sampled[:, step - 1] if step else np.repeat(history[:, -1], samples, axis=0)
+                next_features = last_day[:, None, :].copy()
+                next_features[:, 0, 0] = output[:, 0]
+            next_features = next_features[:, :days - step]
+            count = next_features.shape[1]
+            sampled[:, step:step + count] = next_features
+            step += count
+
+        return self.scaler.inverse_transform(
+            sampled.reshape(-1, len(FEATURES))
+        ).reshape(windows, samples, days, len(FEATURES))
+
+    def generate_forecasts(self, locations, days=7):
+        """
+        Forecast many locations at once. Returns {location_id: forecast_data} in the
+        same shape as generate_forecast; locations without any history are omitted.
+
+        Locations are grouped by the artifact that serves them (their own model or
+        the global one), with one batched forward pass per artifact. Locations with
+        less than SEQUENCE_LENGTH days, or whose model can't be loaded, get the
+        statistical fallback. Every row names the forecaster and model version
+        that produced it; rows standing in for a model that failed to load are
+        also marked 'degraded', so they are neither cached nor stored.
+        """
+        locations = list(locations)
+        windows = self.load_history_windows(locations)
+        if not windows:
+            return {}
+
+        groups = {}
+        fallback_ids = []
+        degraded_ids = set()
+        for location_id, (_, values) in windows.items():
+            if len(values) < SEQUENCE_LENGTH:
+                fallback_ids.append(location_id)
+            else:
+                groups.setdefault(model_registry.resolve_artifact(location_id), []).append(location_id)
+
+        names = {location.id: location.name for location in locations}
+        forecasts = {}
+        for artifact_dir, location_ids in groups.items():
+            try:
+                self.load_lstm_model(artifact_dir)
+            except (OSError, ImportError) as e:
+                logger.warning(f"Forecast model {artifact_dir or 'legacy'} unavailable, using fallback: {str(e)}")
+                fallback_ids.extend(location_ids)
+                degraded_ids.update(location_ids)
+                continue
+            forecasts.update(self._forecast_group(
+                location_ids, windows, names, days, model_registry.version_of(artifact_dir)
+            ))
+
+        if fallback_ids:
+            fallback = self._fallback_group(fallback_ids, windows, names, days)
+            for location_id in degraded_ids:
+                for day in fallback[location_id]:
+                    day['degraded'] = True
+            forecasts.update(fallback)
+        return forecasts
+
+    def scale_windows(self, input_data):
+        """Scale real-unit windows of shape (N, SEQUENCE_LENGTH, 4) with the loaded scaler."""
+        batch_size = input_data.shape[0]
+        return self.scaler.transform(
+            np.asarray(input_data).reshape(-1, len(FEATURES))
+        ).reshape(batch_size, SEQUENCE_LENGTH, len(FEATURES))
+
+    def _forecast_group(self, location_ids, windows, names, days, model_version=None):
+        input_data = np.stack([windows[location_id][1] for location_id in location_ids])
+        input_scaled = self.scale_windows(input_data)
+
+        bounds = None
+        if self.metadata.get('dropout'):
+            # Monte Carlo dropout: the sample mean is the forecast, percentiles bound it
+            draws = self.predict_sequences(input_scaled, days, samples=settings.FORECAST_MC_SAMPLES)
+            predictions = draws.mean(axis=1)
+            bounds = np.percentile(draws[..., 0], settings.FORECAST_INTERVAL_PERCENTILES, axis=1)
+        else:
+            predictions = self.predict_sequences(input_scaled, days)
+
+        # Only direct models actually forecast the non-temperature features
+        direct = self.metadata['mode'] == 'direct'
+        return self._build_rows(location_ids, windows, names, predictions, 'lstm', direct, bounds, model_version)
+
+    def _fallback_group(self, location_ids, windows, names, days):
+        forecaster = get_fallback_forecaster()
+        # Right-align every history in a NaN-padded (N, SEQUENCE_LENGTH, 4) array
+        series = np.full((len(location_ids), SEQUENCE_LENGTH, len(FEATURES)), np.nan, dtype=np.float32)
+        for row, location_id in enumerate(location_ids):
+            values = windows[location_id][1]
+            series[row, SEQUENCE_LENGTH - len(values):] = values
+        predictions = forecaster.forecast(series, days)
+        return self._build_rows(location_ids, windows, names, predictions, forecaster.name, True)
+
+    def _build_rows(self, location_ids, windows, names, predictions, forecaster, include_extras, bounds=None,
+                    model_version=None):
+        """
+        Forecast rows from real-unit predictions (N, days, 4). `bounds` holds the
+        lower and upper temperature percentiles, shape (2, N, days); without them
+        min/max temperature are a fixed band around the forecast. `model_version`
+        is the artifact version behind LSTM rows, None for the fallback.
+        """
+        forecasts = {}
+        for row, location_id in enumerate(location_ids):
+            last_date = windows[location_id][0]
+            forecast_data = []
+            for i in range(predictions.shape[1]):
+                real_temp, humidity, wind_speed, _ = (float(v) for v in predictions[row, i])
+                day = {
+                    'date': (last_date + timedelta(days=i+1)),
+                    'location': names[location_id],
+                    'temperature': round(real_temp, 1),
+                    'min_temp': round(real_temp - 2 if bounds is None else float(bounds[0, row, i]), 1),
+                    'max_temp': round(real_temp + 2 if bounds is None else float(bounds[1, row, i]), 1),
+                    'description': self.get_weather_description(real_temp),
+                    'forecaster': forecaster,
+                    'model_version': model_version,
+                }
+                if include_extras:
+                    day.update({
+                        'humidity': round(humidity, 1),
+                        'wind_speed': round(wind_speed, 1),
+                    })
+                forecast_data.append(day)
+            forecasts[location_id] = forecast_data
+
+        return forecasts
+
     def generate_forecast(self, location, days=7):
-        self.load_lstm_model()
-        
-        historical_data = list(
-            HistoricalWeatherData.objects.filter(location=location)
-            .order_by('date')
-            .values('date', 'avg_temp', 'avg_humidity', 'avg_wind_speed', 'total_precip_mm', 'location')
+        return self.generate_forecasts([location], days).get(location.id, [])
+
+    def store_forecasts(self, forecasts):
+        """
+        Upsert {location_id: forecast_data} into WeatherForecast in bulk, skipping
+        degraded forecasts. Returns the number of rows written.
+        """
+        now = timezone.now()
+        rows = []
+        for location_id, forecast_data in forecasts.items():
+            # A fallback for a model that failed to load must not outlive the failure
+            if not forecast_data or forecast_data[0].get('degraded'):
+                continue
+            base_date = forecast_data[0]['date'] - timedelta(days=1)
+            for day in forecast_data:
+                rows.append(WeatherForecast(
+                    location_id=location_id,
+                    base_date=base_date,
+                    forecast_date=day['date'],
+                    avg_temp=day['temperature'],
+                    min_temp=day['min_temp'],
+                    max_temp=day['max_temp'],
+                    avg_humidity=day.get('humidity'),
+                    avg_wind_speed=day.get('wind_speed'),
+                    description=day['description'],
+                    forecaster=day.get('forecaster', 'lstm'),
+                    model_version=day.get('model_version'),
+                    created_at=now,
+                ))
+
+        WeatherForecast.objects.bulk_create(
+            rows,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['location', 'base_date', 'forecast_date'],
+            update_fields=[
+                'avg_temp', 'min_temp', 'max_temp', 'avg_humidity', 'avg_wind_speed',
+                'description', 'forecaster', 'model_version', 'created_at',
+            ],
         )
+        return len(rows)
 
-        if len(historical_data) < 30:
-            return []
+    def get_stored_forecast(self, location, days=7, max_age_hours=None):
+        """
+        Serve a forecast from WeatherForecast with a single indexed query.
+        Returns [] when the newest stored run is missing, too old or too short.
+        Pass max_age_hours=0 to accept a run of any age.
+        """
+        if max_age_hours is None:
+            max_age_hours = settings.FORECAST_MAX_AGE_HOURS
+        queryset = WeatherForecast.objects.filter(location=location)
+        if max_age_hours:
+            queryset = queryset.filter(created_at__gte=timezone.now() - timedelta(hours=max_age_hours))
+        rows = list(queryset.order_by('-base_date', 'forecast_date')[:days])
 
-        df = pd.DataFrame(historical_data)
-        features = ['avg_temp', 'avg_humidity', 'avg_wind_speed', 'total_precip_mm']
-        input_data = df[features].values[-30:]
-        input_scaled = self.scaler.transform(input_data)
-        input_scaled = np.expand_dims(input_scaled, axis=0)
+        if len(rows) < days or any(row.base_date != rows[0].base_date for row in rows):
+            return []
 
         forecast_data = []
-        current_input = input_scaled
-        last_date = df['date'].iloc[-1]
-
-        for i in range(days):
-            pred_temp = self.lstm_model.predict(current_input)[0][0]
-            forecast_data.append({
-                'date': (last_date + timedelta(days=i+1)),
+        for row in rows:
+            day = {
+                'date': row.forecast_date,
                 'location': location.name,
-                'temperature': round(pred_temp, 1),
-                'min_temp': round(pred_temp - 2, 1),
-                'max_temp': round(pred_temp + 2, 1),
-                'description': self.get_weather_description(pred_temp),
-            })
-            next_features = np.copy(current_input[0][-1])
-            next_features[0] = pred_temp
-            next_sequence = np.vstack((current_input[0][1:], next_features))
-            current_input = np.expand_dims(next_sequence, axis=0)
-
-        return forecast_data
\ No newline at end of file
+                'temperature': row.avg_temp,
+                'min_temp': row.min_temp,
+                'max_temp': row.max_temp,
+                'description': row.description,
+                'forecaster': row.forecaster,
+                'model_version': row.model_version,
+            }
+            if row.avg_humidity is not None:
+                day.update({'humidity': row.avg_humidity, 'wind_speed': row.avg_wind_speed})
+            forecast_data.append(day)
+        return forecast_data
+
+    def get_forecast(self, location, days=7, offload=False):
+        """
+        Read path for views: forecast cache, then stored forecast, and live
+        inference only when both are stale or missing.
+
+        With offload=True live inference runs under FORECAST_LATENCY_BUDGET_SECONDS
+        in the forecast process pool, the shared inference server
+        (FORECAST_INFERENCE_MODE='server') or, with 'local', on threads of this
+        process, for workers sharing preloaded models (gunicorn.conf.py). When
+        the pool is saturated or over budget the statistical fallback answers
+        instead; that answer is neither cached nor stored, so the next request
+        tries the model again. ForecastUnavailable is only raised when the
+        fallback has no history either.
+        """
+        try:
+            return forecast_cache.get_or_compute(
+                location, days, lambda: self._get_uncached_forecast(location, days, offload)
+            )
+        except ForecastUnavailable as e:
+            forecast_data = self.fallback_forecast(location, days)
+            if not forecast_data:
+                raise
+            logger.info(f"Served fallback forecast for {location.name}: {str(e)}")
+            return forecast_data
+
+    def fallback_forecast(self, location, days=7):
+        windows = self.load_history_windows([location])
+        if not windows:
+            return []
+        return self._fallback_group([location.id], windows, {location.id: location.name}, days)[location.id]
+
+    def _get_uncached_forecast(self, location, days, offload=False):
+        forecast_data = self.get_stored_forecast(location, days)
+        if forecast_data:
+            return forecast_data
+
+        if offload and settings.FORECAST_INFERENCE_MODE == 'server':
+            forecast_data = inference_client.forecast(
+                location.id, days, timeout=settings.FORECAST_LATENCY_BUDGET_SECONDS
+            )
+        elif offload and settings.FORECAST_INFERENCE_MODE in ('pool', 'local'):
+            pool = forecast_pool if settings.FORECAST_INFERENCE_MODE == 'pool' else local_forecast_pool
+            forecast_data = pool.run(
+                lstm_forecast, location.id, days, timeout=settings.FORECAST_LATENCY_BUDGET_SECONDS
+            )
+        else:
+            forecast_data = self.generate_forecast(location, days)
+        if forecast_data and forecast_data[0].get('degraded'):
+            # Served uncached by get_forecast, so the next request tries the model again
+            raise ForecastUnavailable("Forecast model could not be loaded")
+        if forecast_data:
+            self.store_forecasts({location.id: forecast_data})
+        return forecast_data
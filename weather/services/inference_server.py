@@ -0,0 +1,181 @@
+import logging
+import os
+import queue
+import threading
+import time
+from multiprocessing.connection import Client, Listener
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from weather.services.forecast_pool import ForecastTimeout, ForecastUnavailable
+
+logger = logging.getLogger(__name__)
+
+
+def forecast_locations(location_ids, days):
+    """Default batch function: one batched ForecastService pass over `location_ids`."""
+    from weather.models import Location
+    from weather.services.forecast_service import ForecastService
+
+    close_old_connections()
+    locations = Location.objects.filter(id__in=location_ids)
+    return ForecastService().generate_forecasts(locations, days)
+
+
+class _Request:
+    __slots__ = ('location_id', 'days', 'reply', 'done')
+
+    def __init__(self, location_id, days):
+        self.location_id = location_id
+        self.days = days
+        self.reply = None
+        self.done = threading.Event()
+
+
+class InferenceServer:
+    """
+    Local forecast sidecar holding the only copy of the models.
+
+    Web and Celery workers connect over a Unix socket (multiprocessing.connection,
+    authenticated with FORECAST_INFERENCE_AUTHKEY) and send (location_id, days).
+    Requests arriving within `window` seconds of each other are coalesced into one
+    micro-batch of at most `max_batch` locations, forecast with a single batched
+    pass per horizon and answered individually.
+    """
+
+    def __init__(self, address=None, authkey=None, window=None, max_batch=None, forecast_fn=forecast_locations):
+        self.address = address or settings.FORECAST_INFERENCE_SOCKET
+        self.authkey = authkey or settings.FORECAST_INFERENCE_AUTHKEY.encode()
+        self.window = settings.FORECAST_INFERENCE_BATCH_WINDOW_MS / 1000 if window is None else window
+        self.max_batch = max_batch or settings.FORECAST_INFERENCE_MAX_BATCH
+        self.forecast_fn = forecast_fn
+        self._queue = queue.Queue()
+        self._listener = None
+        self.batches = 0
+        self.requests = 0
+
+    def start(self):
+        """Bind the socket and start the batching thread; serve_forever() then accepts clients."""
+        if os.path.exists(self.address):
+            os.unlink(self.address)  # left behind by a previous server that didn't shut down cleanly
+        self._listener = Listener(self.address, family='AF_UNIX', authkey=self.authkey)
+        threading.Thread(target=self._batch_loop, name='inference-batcher', daemon=True).start()
+        return self
+
+    def serve_forever(self):
+        while True:
+            try:
+                conn = self._listener.accept()
+            except OSError:
+                if self._listener is None:
+                    return  # closed
+                logger.exception("Rejected inference client")
+                continue
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def close(self):
+        listener, self._listener = self._listener, None
+        if listener is not None:
+            listener.close()
+
+    def _handle(self, conn):
+        """One thread per client connection; clients send one request at a time."""
+        with conn:
+            while True:
+                try:
+                    location_id, days = conn.recv()
+                except (EOFError, OSError):
+                    return
+                request = _Request(location_id, days)
+                self._queue.put(request)
+                request.done.wait()
+                try:
+                    conn.send(request.reply)
+                except OSError:
+                    return
+
+    def _batch_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._run_batch(batch)
+
+    def _run_batch(self, batch):
+        by_days = {}
+        for request in batch:
+            by_days.setdefault(request.days, []).append(request)
+
+        for days, requests in by_days.items():
+            start = time.perf_counter()
+            try:
+                forecasts = self.forecast_fn(sorted({r.location_id for r in requests}), days)
+                replies = {r.location_id: ('ok', forecasts.get(r.location_id, [])) for r in requests}
+            except Exception as e:
+                logger.exception(f"Inference batch of {len(requests)} failed")
+                replies = {r.location_id: ('error', str(e)) for r in requests}
+            self.batches += 1
+            self.requests += len(requests)
+            for request in requests:
+                request.reply = replies[request.location_id]
+                request.done.set()
+            logger.debug(f"Forecast batch of {len(requests)} ({days} days) in {time.perf_counter() - start:.3f}s")
+
+
+class InferenceClient:
+    """
+    Client side of InferenceServer. Each thread keeps its own connection, so
+    concurrent requests from one worker reach the server concurrently and can
+    share a micro-batch.
+    """
+
+    def __init__(self, address=None, authkey=None):
+        self.address = address
+        self.authkey = authkey
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = Client(
+                self.address or settings.FORECAST_INFERENCE_SOCKET,
+                family='AF_UNIX',
+                authkey=self.authkey or settings.FORECAST_INFERENCE_AUTHKEY.encode(),
+            )
+            self._local.conn = conn
+        return conn
+
+    def _drop(self):
+        conn = getattr(self._local, 'conn', None)
+        self._local.conn = None
+        if conn is not None:
+            conn.close()
+
+    def forecast(self, location_id, days, timeout=None):
+        timeout = timeout or settings.FORECAST_DEADLINE_SECONDS
+        try:
+            conn = self._connection()
+            conn.send((location_id, days))
+            if not conn.poll(timeout):
+                # A late reply would be read by the next request on this connection
+                self._drop()
+                raise ForecastTimeout("Forecast took too long")
+            status, result = conn.recv()
+        except (OSError, EOFError) as e:
+            self._drop()
+            raise ForecastUnavailable("Inference server unavailable") from e
+
+        if status != 'ok':
+            raise ForecastUnavailable(f"Inference server error: {result}")
+        return result
+
+
+inference_client = InferenceClient()
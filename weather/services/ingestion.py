@@ -0,0 +1,217 @@
+import asyncio
+import logging
+import queue
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+from django.conf import settings
+from django.utils import timezone
+
+from weather.models import WeatherData, fetch_cell_for
+from weather.services.weatherapi_client import RETRY_STATUSES, WeatherAPIClient, weatherapi_client
+
+logger = logging.getLogger(__name__)
+
+def parse_current(location, data, timestamp):
+    """WeatherData for a WeatherAPI current.json response, or None when it has no reading."""
+    weather_info = data.get("current", {})
+    if not weather_info:
+        return None
+    condition_info = weather_info.get("condition", {})
+    return WeatherData(
+        location=location,
+        timestamp=timestamp,
+        temperature=weather_info.get("temp_c"),
+        humidity=weather_info.get("humidity"),
+        wind_speed=weather_info.get("wind_kph", 0) / 3.6,  # Convert km/h to m/s
+        precipitation=weather_info.get("precip_mm", 0),
+        pressure=weather_info.get("pressure_mb"),
+        description=condition_info.get("text", "Unknown"),
+        weather_icon_url=f"https:{condition_info.get('icon', '')}",  # Full icon URL
+    )
+
+
+def group_by_cell(locations):
+    """
+    Locations keyed by fetch cell, in first-seen order. Nearby locations share a
+    cell, so one upstream reading (taken at the first member's coordinates)
+    stands in for all of them.
+    """
+    cells = defaultdict(list)
+    for location in locations:
+        cells[fetch_cell_for(location.latitude, location.longitude)].append(location)
+    return cells
+
+
+def refresh_current_weather(locations):
+    """
+    Current weather for `locations` through WeatherAPI bulk requests: one lookup
+    per fetch cell, WEATHER_API_BULK_SIZE cells per call and a single bulk_create
+    for all resulting rows. Returns stored/failed location counts, the number of
+    cells looked up and of bulk HTTP requests sent.
+    """
+    cells = list(group_by_cell(locations).items())
+    bulk_size = settings.WEATHER_API_BULK_SIZE
+    timestamp = timezone.now()
+    rows = []
+    failed = 0
+    requests_sent = 0
+
+    for start in range(0, len(cells), bulk_size):
+        chunk = dict(cells[start:start + bulk_size])
+        requests_sent += 1
+        try:
+            results = weatherapi_client.bulk_current({
+                cell: f"{members[0].latitude},{members[0].longitude}" for cell, members in chunk.items()
+            })
+        except requests.RequestException as exc:
+            logger.error(f"Bulk weather fetch failed for {len(chunk)} cells: {exc}")
+            failed += sum(len(members) for members in chunk.values())
+            continue
+
+        for cell, members in chunk.items():
+            if cell not in results:
+                failed += len(members)
+                continue
+            for location in members:
+                row = parse_current(location, results[cell], timestamp)
+                if row is not None:
+                    rows.append(row)
+
+    WeatherData.objects.bulk_create(rows, batch_size=500)
+    logger.info(f"Fetched weather for {len(rows)} of {len(locations)} locations from {len(cells)} cells in "
+                f"{requests_sent} bulk requests")
+    return {'stored': len(rows), 'failed': failed, 'cells': len(cells), 'requests': requests_sent}
+
+
+class AsyncIngestor:
+    """
+    Concurrent current-weather ingestion for many locations.
+
+    An asyncio loop on a helper thread keeps up to `concurrency` requests in
+    flight (an asyncio semaphore); the blocking HTTP calls run on a thread pool
+    sharing one WeatherAPIClient whose keep-alive pool allows at most `per_host`
+    connections to the upstream host. Locations sharing a fetch cell are fetched
+    once and the reading stored for each of them. Failed requests are retried here,
+    with jittered exponential backoff, instead of blocking a thread in the client.
+    Parsed readings are handed back to the calling thread,
+    which stores them with bulk_create every `batch_size` rows, so the database
+    sees a handful of inserts on the caller's own connection.
+    """
+
+    def __init__(self, api_key=None, base_url=None, concurrency=20, per_host=None, retries=3,
+                 backoff=0.5, batch_size=500, store=True):
+        self.client = WeatherAPIClient(
+            base_url=base_url, api_key=api_key, retries=0, pool_size=per_host or concurrency
+        )
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.batch_size = batch_size
+        self.store = store
+
+    def run(self, locations, skip_ids=()):
+        """Fetch and store every location not in `skip_ids`. Returns the throughput stats."""
+        locations = [location for location in locations if location.id not in skip_ids]
+        cells = list(group_by_cell(locations).values())
+        self.stats = {
+            'locations': len(locations), 'requests': len(cells),
+            'stored': 0, 'empty': 0, 'failed': 0, 'retries': 0, 'errors': [],
+        }
+        self._latencies = []
+        self._timestamp = timezone.now()
+        rows = queue.Queue()
+        failure = []
+
+        def fetch_all():
+            try:
+                asyncio.run(self._fetch_all(cells, rows))
+            except BaseException as e:
+                failure.append(e)
+            finally:
+                rows.put(None)
+
+        start = time.perf_counter()
+        fetcher = threading.Thread(target=fetch_all, name='ingest-fetch', daemon=True)
+        fetcher.start()
+
+        batch = []
+        while True:
+            row = rows.get()
+            if row is not None:
+                batch.append(row)
+            if batch and (row is None or len(batch) >= self.batch_size):
+                if self.store:
+                    WeatherData.objects.bulk_create(batch)
+                self.stats['stored'] += len(batch)
+                batch = []
+            if row is None:
+                break
+        fetcher.join()
+        if failure:
+            raise failure[0]
+
+        elapsed = time.perf_counter() - start
+        latencies = np.array(self._latencies) * 1000
+        self.stats.update({
+            'seconds': elapsed,
+            'throughput': len(locations) / elapsed if elapsed else 0.0,
+            'p50_ms': float(np.percentile(latencies, 50)) if len(latencies) else None,
+            'p95_ms': float(np.percentile(latencies, 95)) if len(latencies) else None,
+        })
+        return self.stats
+
+    async def _fetch_all(self, cells, rows):
+        self._http = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='ingest-http')
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        try:
+            await asyncio.gather(*(self._ingest(members, rows) for members in cells))
+        finally:
+            self._http.shutdown()
+
+    def _get(self, location):
+        start = time.perf_counter()
+        try:
+            return self.client.current(f"{location.latitude},{location.longitude}")
+        finally:
+            self._latencies.append(time.perf_counter() - start)
+
+    async def _fetch(self, location):
+        loop = asyncio.get_running_loop()
+        for attempt in range(self.retries + 1):
+            try:
+                async with self._semaphore:
+                    return await loop.run_in_executor(self._http, self._get, location)
+            except requests.HTTPError as e:
+                if e.response.status_code not in RETRY_STATUSES:
+                    raise
+                error = e
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            if attempt == self.retries:
+                raise error
+            self.stats['retries'] += 1
+            # Full jitter keeps retries from many locations from arriving in lockstep
+            await asyncio.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+
+    async def _ingest(self, members, rows):
+        location = members[0]
+        try:
+            data = await self._fetch(location)
+        except (requests.RequestException, ValueError) as e:
+            self.stats['failed'] += len(members)
+            self.stats['errors'].append((location.name, str(e)))
+            logger.error(f"Failed to fetch weather for {location.name}: {str(e)}")
+            return
+
+        for member in members:
+            row = parse_current(member, data, self._timestamp)
+            if row is None:
+                self.stats['empty'] += 1
+                continue
+            rows.put(row)
@@ -0,0 +1,299 @@
+import json
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+# Heavy ML imports live inside the loaders so importing this module (and the
+# views/tasks that use it) doesn't pull in TensorFlow, h5py or scikit-learn.
+def load_keras_model(path):
+    from tensorflow.keras.models import load_model
+    return load_model(path, compile=False)
+
+
+def load_numpy_model(path):
+    from weather.services.numpy_lstm import NumpyLSTMModel
+    return NumpyLSTMModel.from_h5(path)
+
+
+MODEL_LOADERS = {
+    'keras': load_keras_model,
+    'numpy': load_numpy_model,
+}
+
+
+def load_metadata(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+# Artifacts trained before metadata existed are one-step temperature models
+DEFAULT_METADATA = {
+    'mode': 'autoregressive',
+    'horizon': 1,
+    'sequence_length': 30,
+    'features': ['avg_temp', 'avg_humidity', 'avg_wind_speed', 'total_precip_mm'],
+    'dropout': 0.0,
+}
+
+
+def load_scaler(path):
+    import joblib
+    return joblib.load(path)
+
+
+# File names inside a versioned artifact directory
+MODEL_FILE = 'model.h5'
+SCALER_FILE = 'scaler.save'
+GLOBAL_ARTIFACT = 'global'
+# Names the active version, inside FORECAST_ARTIFACT_DIR
+POINTER_FILE = 'CURRENT'
+
+
+def artifact_key(location_id=None):
+    """Directory name of a location's artifact within a training run version."""
+    return GLOBAL_ARTIFACT if location_id is None else f"location-{location_id}"
+
+
+class ModelRegistry:
+    """
+    Process-wide cache for forecast artifacts (LSTM model, scaler).
+
+    Each artifact is loaded at most once per process and is keyed by its
+    path, modification time and loader, so replacing a file on disk is
+    picked up on the next lookup without restarting the worker.
+
+    Artifacts come from the training run named by the CURRENT pointer file in
+    FORECAST_ARTIFACT_DIR (the newest run if there is no pointer): a location's
+    own model when it has one, the run's global model otherwise, and the legacy
+    FORECAST_MODEL_PATH files before any run is published.
+
+    The pointer is re-read at most every FORECAST_VERSION_CHECK_SECONDS. A new
+    version is loaded by a background thread while the old one keeps serving,
+    then swapped in with a single assignment, so rollouts and rollbacks need no
+    restart and cause no cold-start stall on the request path.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()  # guards the dicts and counters; never held while loading
+        self._load_lock = threading.Lock()  # serializes artifact loads
+        self._artifacts = {}
+        self._hits = 0
+        self._misses = 0
+        self._load_times = {}
+        self._active = None  # (version, artifact keys) being served
+        self._pending = None  # (version, loader thread) being loaded in the background
+        self._failed = None  # version that failed to load; not retried until the pointer moves
+        self._next_check = 0.0
+
+    def get(self, path, loader):
+        path = str(path)
+        key = (path, os.path.getmtime(path), loader.__name__)
+
+        artifact = self._artifacts.get(key)
+        if artifact is None:
+            with self._load_lock:
+                # Another thread may have loaded it while we were waiting
+                artifact = self._artifacts.get(key)
+                if artifact is None:
+                    start = time.perf_counter()
+                    artifact = loader(path)
+                    elapsed = time.perf_counter() - start
+
+                    with self._lock:
+                        # Drop stale versions of the same file
+                        for stale_key in [k for k in self._artifacts if k[0] == path and k[2] == key[2]]:
+                            del self._artifacts[stale_key]
+                        self._artifacts[key] = artifact
+                        self._misses += 1
+                        self._load_times[path] = elapsed
+                    logger.info(f"Loaded forecast artifact {path} in {elapsed:.3f}s")
+                    return artifact
+
+        with self._lock:
+            self._hits += 1
+        return artifact
+
+    def read_pointer(self):
+        """Version named by the CURRENT file, else the newest version directory, else None."""
+        root = str(settings.FORECAST_ARTIFACT_DIR)
+        try:
+            with open(os.path.join(root, POINTER_FILE)) as f:
+                return f.read().strip() or None
+        except OSError:
+            pass
+        versions = self.versions()
+        return versions[-1] if versions else None
+
+    def versions(self):
+        """Published version names, oldest first."""
+        root = str(settings.FORECAST_ARTIFACT_DIR)
+        try:
+            names = os.listdir(root)
+        except OSError:
+            return []
+        return sorted(
+            name for name in names
+            if not name.startswith('.') and os.path.isdir(os.path.join(root, name))
+        )
+
+    def _current_version(self):
+        """(version, artifact keys) of the active training run, or None."""
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + settings.FORECAST_VERSION_CHECK_SECONDS
+            self.refresh()
+        return self._active
+
+    def refresh(self, wait=False):
+        """
+        Check the version pointer now. A changed version starts loading in the
+        background and replaces the active one once every artifact is in memory;
+        with wait=True this blocks until that swap happened (or failed).
+        """
+        version = self.read_pointer()
+        active = self._active
+        if version is None or version == self._failed or (active and active[0] == version):
+            return
+
+        if active is None:
+            # Nothing is being served yet, so there is nothing to keep warm; artifacts load on first use
+            try:
+                self._activate(version)
+            except OSError as e:
+                logger.error(f"Forecast model version {version} is not readable: {str(e)}")
+                self._failed = version
+            return
+
+        with self._lock:
+            if self._pending is None or self._pending[0] != version:
+                thread = threading.Thread(
+                    target=self._load_version, args=(version,), name=f"forecast-model-{version}", daemon=True
+                )
+                self._pending = (version, thread)
+                thread.start()
+            thread = self._pending[1]
+        if wait:
+            thread.join()
+
+    def preload(self, version=None):
+        """Load every artifact of `version` (the active one by default) into memory."""
+        version = version or (self._current_version() or (None,))[0]
+        if version is None:
+            self.get_lstm_model()
+            self.get_scaler()
+            return
+        version_dir = os.path.join(str(settings.FORECAST_ARTIFACT_DIR), version)
+        for key in os.listdir(version_dir):
+            artifact_dir = os.path.join(version_dir, key)
+            if os.path.exists(os.path.join(artifact_dir, MODEL_FILE)):
+                self.get_lstm_model(artifact_dir=artifact_dir)
+                self.get_scaler(artifact_dir)
+                self.get_model_metadata(artifact_dir)
+
+    def _load_version(self, version):
+        start = time.perf_counter()
+        try:
+            self.preload(version)
+            self._activate(version)
+        except Exception:
+            logger.exception(f"Failed to load forecast model version {version}; still serving {self._active[0]}")
+            with self._lock:
+                self._pending = None
+                self._failed = version
+            return
+        logger.info(f"Forecast model version {version} loaded in {time.perf_counter() - start:.2f}s and activated")
+
+    def _activate(self, version):
+        root = str(settings.FORECAST_ARTIFACT_DIR)
+        version_dir = os.path.join(root, version)
+        active = (version, frozenset(os.listdir(version_dir)))
+        with self._lock:
+            self._active = active
+            self._pending = None
+            self._failed = None
+            # Models from other versions are never looked up again
+            for key in [k for k in self._artifacts if k[0].startswith(root) and not k[0].startswith(version_dir + os.sep)]:
+                del self._artifacts[key]
+
+    def publish(self, version):
+        """Point every worker at `version`; they load it in the background within FORECAST_VERSION_CHECK_SECONDS."""
+        root = str(settings.FORECAST_ARTIFACT_DIR)
+        if not os.path.isdir(os.path.join(root, version)):
+            raise ValueError(f"Unknown forecast model version {version}")
+        tmp_path = os.path.join(root, f".{POINTER_FILE}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w') as f:
+            f.write(version)
+        os.replace(tmp_path, os.path.join(root, POINTER_FILE))
+        self._next_check = 0.0
+
+    def current_version_dir(self):
+        """Directory of the active training run, or None before the first one."""
+        current = self._current_version()
+        return os.path.join(str(settings.FORECAST_ARTIFACT_DIR), current[0]) if current else None
+
+    def resolve_artifact(self, location_id=None):
+        """Artifact directory serving `location_id` (None for the global model), or None for legacy files."""
+        current = self._current_version()
+        if current is None:
+            return None
+        version, keys = current
+        key = artifact_key(location_id)
+        return os.path.join(str(settings.FORECAST_ARTIFACT_DIR), version, key if key in keys else GLOBAL_ARTIFACT)
+
+    def _model_path(self, artifact_dir):
+        return os.path.join(artifact_dir, MODEL_FILE) if artifact_dir else str(settings.FORECAST_MODEL_PATH)
+
+    def get_lstm_model(self, backend=None, artifact_dir=None):
+        backend = backend or settings.FORECAST_BACKEND
+        return self.get(self._model_path(artifact_dir), MODEL_LOADERS[backend])
+
+    def get_scaler(self, artifact_dir=None):
+        path = os.path.join(artifact_dir, SCALER_FILE) if artifact_dir else settings.FORECAST_SCALER_PATH
+        return self.get(path, load_scaler)
+
+    def get_model_metadata(self, artifact_dir=None):
+        path = os.path.splitext(self._model_path(artifact_dir))[0] + '.json'
+        if not os.path.exists(path):
+            return DEFAULT_METADATA
+        return {**DEFAULT_METADATA, **self.get(path, load_metadata)}
+
+    def version_of(self, artifact_dir):
+        """Version an artifact directory belongs to (the legacy file version for None)."""
+        return os.path.basename(os.path.dirname(artifact_dir)) if artifact_dir else self.model_version()
+
+    def model_version(self):
+        """Identifier of the active artifacts; changes whenever a new version is swapped in or a file replaced."""
+        current = self._current_version()
+        if current is not None:
+            return current[0]
+        try:
+            return '-'.join(
+                str(int(os.path.getmtime(path)))
+                for path in (settings.FORECAST_MODEL_PATH, settings.FORECAST_SCALER_PATH)
+            )
+        except OSError:
+            return 'none'  # no model yet; forecasts come from the statistical fallback
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'load_times': dict(self._load_times),
+                'loaded': [f"{path} ({loader})" for path, _, loader in self._artifacts],
+                'active_version': self._active[0] if self._active else None,
+                'pending_version': self._pending[0] if self._pending else None,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._artifacts.clear()
+
+
+model_registry = ModelRegistry()
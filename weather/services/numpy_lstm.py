@@ -0,0 +1,166 @@
+import json
+
+import h5py
+import numpy as np
+
+
+def _sigmoid(x):
+    np.negative(x, out=x)
+    np.exp(x, out=x)
+    x += 1.0
+    np.reciprocal(x, out=x)
+
+
+def _relu(x):
+    np.maximum(x, 0.0, out=x)
+
+
+def _tanh(x):
+    np.tanh(x, out=x)
+
+
+ACTIVATIONS = {
+    'relu': _relu,
+    'tanh': _tanh,
+    'sigmoid': _sigmoid,
+}
+
+
+def _collect_weights(group):
+    """Map dataset basenames ('kernel', 'recurrent_kernel', 'bias') to arrays under an h5 group."""
+    weights = {}
+
+    def visit(name, obj):
+        if isinstance(obj, h5py.Dataset):
+            # Keras 2 files suffix weight names with ':0'
+            weights[name.rsplit('/', 1)[-1].split(':')[0]] = obj[()].astype(np.float32)
+
+    group.visititems(visit)
+    return weights
+
+
+class NumpyLSTMModel:
+    """
+    Inference-only port of the Sequential(LSTM, Dense) forecast model.
+
+    Weights are read once from the Keras .h5 file and the forward pass is plain
+    float32 NumPy, so serving a forecast doesn't need TensorFlow. Exposes the
+    same predict() signature the forecast service uses on Keras models. A
+    trailing Reshape layer (direct multi-horizon models) is applied to the output.
+    Like a Keras model, calling it with training=True applies the Dropout layer,
+    which the forecast service uses for Monte Carlo intervals.
+    """
+
+    def __init__(self, kernel, recurrent_kernel, bias, dense_kernel, dense_bias,
+                 activation='relu', recurrent_activation='sigmoid', output_shape=None, dropout=0.0):
+        self.kernel = np.ascontiguousarray(kernel, dtype=np.float32)
+        self.recurrent_kernel = np.ascontiguousarray(recurrent_kernel, dtype=np.float32)
+        self.bias = np.ascontiguousarray(bias, dtype=np.float32)
+        self.dense_kernel = np.ascontiguousarray(dense_kernel, dtype=np.float32)
+        self.dense_bias = np.ascontiguousarray(dense_bias, dtype=np.float32)
+        self.units = self.recurrent_kernel.shape[0]
+        self.activation = ACTIVATIONS[activation]
+        self.recurrent_activation = ACTIVATIONS[recurrent_activation]
+        self.output_shape = tuple(output_shape) if output_shape else None
+        self.dropout = dropout
+
+    @classmethod
+    def from_h5(cls, path):
+        with h5py.File(path, 'r') as f:
+            config = json.loads(f.attrs['model_config'])
+            layers = {
+                layer['class_name']: layer['config']
+                for layer in config['config']['layers']
+            }
+            lstm_config = layers['LSTM']
+            dense_config = layers['Dense']
+
+            lstm = _collect_weights(f['model_weights'][lstm_config['name']])
+            dense = _collect_weights(f['model_weights'][dense_config['name']])
+
+        return cls(
+            lstm['kernel'],
+            lstm['recurrent_kernel'],
+            lstm['bias'],
+            dense['kernel'],
+            dense['bias'],
+            activation=lstm_config.get('activation', 'tanh'),
+            recurrent_activation=lstm_config.get('recurrent_activation', 'sigmoid'),
+            output_shape=layers.get('Reshape', {}).get('target_shape'),
+            dropout=layers.get('Dropout', {}).get('rate', 0.0),
+        )
+
+    def __call__(self, inputs, training=False, rng=None):
+        return self.predict(inputs, training=training, rng=rng)
+
+    def predict(self, inputs, batch_size=None, verbose=0, training=False, rng=None):
+        h, _ = self.encode(inputs)
+        return self.head(h, training=training, rng=rng)
+
+    def encode(self, inputs, state=None):
+        """
+        Run the LSTM over inputs of shape (batch, steps, features), starting from
+        `state` ((h, c), zeros by default). Returns the final (h, c); the caller's
+        state arrays are not modified.
+        """
+        inputs = np.asarray(inputs, dtype=np.float32)
+        batch, steps, _ = inputs.shape
+        units = self.units
+
+        # Input projections for every timestep in one matmul: (batch, steps, 4 * units)
+        input_proj = inputs @ self.kernel
+        input_proj += self.bias
+
+        # Gate buffers are allocated once per call and reused for every timestep
+        if state is None:
+            h = np.zeros((batch, units), dtype=np.float32)
+            c = np.zeros((batch, units), dtype=np.float32)
+        else:
+            h, c = (np.array(part, dtype=np.float32) for part in state)
+        z = np.empty((batch, 4 * units), dtype=np.float32)
+        cell_out = np.empty((batch, units), dtype=np.float32)
+
+        # Keras gate order: input, forget, candidate, output
+        i = z[:, :units]
+        f = z[:, units:2 * units]
+        g = z[:, 2 * units:3 * units]
+        o = z[:, 3 * units:]
+
+        for t in range(steps):
+            np.matmul(h, self.recurrent_kernel, out=z)
+            z += input_proj[:, t, :]
+
+            self.recurrent_activation(i)
+            self.recurrent_activation(f)
+            self.activation(g)
+            self.recurrent_activation(o)
+
+            c *= f
+            g *= i
+            c += g
+
+            np.copyto(cell_out, c)
+            self.activation(cell_out)
+            np.multiply(o, cell_out, out=h)
+
+        return h, c
+
+    def head(self, h, training=False, rng=None):
+        """
+        Dropout (only when training), Dense and the optional Reshape on LSTM outputs.
+        Dropout masks are drawn from `rng`, or a fresh Generator per call: the model
+        is shared by concurrent requests and Generators are not thread-safe.
+        """
+        batch = h.shape[0]
+        if training and self.dropout:
+            # Inverted dropout between the LSTM and Dense layers, as Keras applies it
+            rng = rng or np.random.default_rng()
+            keep = rng.random(h.shape, dtype=np.float32) >= self.dropout
+            h = h * keep
+            h *= 1.0 / (1.0 - self.dropout)
+
+        output = h @ self.dense_kernel
+        output += self.dense_bias
+        if self.output_shape:
+            return output.reshape((batch,) + self.output_shape)
+        return output
@@ -0,0 +1,171 @@
+import heapq
+import logging
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from weather.models import AlertThreshold, Location, UserLocation, WeatherData, fetch_cell_for
+
+logger = logging.getLogger(__name__)
+
+# Reading columns that demand is measured on, and the change in each that counts as "a lot"
+READING_FIELDS = ['temperature', 'wind_speed', 'humidity', 'precipitation']
+FIELD_SCALES = np.array([2.0, 3.0, 10.0, 2.0])
+THRESHOLD_FIELDS = {
+    # condition: (reading field, direction)
+    'temp_above': ('temperature', 1),
+    'temp_below': ('temperature', -1),
+    'rain_above': ('precipitation', 1),
+    'wind_above': ('wind_speed', 1),
+    'humidity_above': ('humidity', 1),
+    'humidity_below': ('humidity', -1),
+}
+# Urgency weights: a threshold about to trip counts like three more doublings of
+# subscribers, a standard deviation of one field scale over the window like one
+ALERT_WEIGHT = 3.0
+VOLATILITY_WEIGHT = 1.0
+
+
+def load_demand(now):
+    """
+    Per-location demand signals in five queries. Returns location ids, fetch
+    cells, watchers (subscribers plus active thresholds), how close the nearest
+    threshold is to tripping (0..1), recent volatility, and the last reading and
+    last dispatch times (epoch seconds, -inf if never).
+    """
+    locations = list(Location.objects.values_list('id', 'latitude', 'longitude', 'last_dispatched_at'))
+    if not locations:
+        return None
+    ids = np.array([row[0] for row in locations], dtype=np.int64)
+    cells = [fetch_cell_for(latitude, longitude) for _, latitude, longitude, _ in locations]
+    last_dispatched = np.array([
+        dispatched.timestamp() if dispatched else -np.inf for *_, dispatched in locations
+    ])
+    index = {location_id: i for i, location_id in enumerate(ids.tolist())}
+
+    watchers = np.zeros(len(ids))
+    for location_id, subscribers in UserLocation.objects.values_list('location_id').annotate(n=Count('id')):
+        watchers[index[location_id]] += subscribers
+
+    last_reading = np.full(len(ids), -np.inf)
+    for location_id, timestamp in WeatherData.objects.values_list('location_id').annotate(last=Max('timestamp')):
+        last_reading[index[location_id]] = timestamp.timestamp()
+
+    readings = list(
+        WeatherData.objects
+        .filter(timestamp__gte=now - timedelta(hours=settings.WEATHER_POLL_VOLATILITY_HOURS))
+        .order_by('-timestamp')
+        .values_list('location_id', *READING_FIELDS)
+    )
+    volatility = np.zeros(len(ids))
+    latest = np.full((len(ids), len(READING_FIELDS)), np.nan)
+    if readings:
+        reading_locations, *values = zip(*readings)
+        rows = np.array([index[location_id] for location_id in reading_locations])
+        values = np.array(values, dtype=np.float64).T / FIELD_SCALES  # (readings, fields), in scale units
+
+        # Newest reading per location is its first row, as rows are newest first
+        seen, first = np.unique(rows, return_index=True)
+        latest[seen] = values[first] * FIELD_SCALES
+
+        # Per-location standard deviation of every field from bincount sums
+        values = np.nan_to_num(values)
+        counts = np.bincount(rows, minlength=len(ids))[:, None]
+        sums = np.stack([np.bincount(rows, weights=column, minlength=len(ids)) for column in values.T], axis=1)
+        squares = np.stack([np.bincount(rows, weights=column ** 2, minlength=len(ids)) for column in values.T], axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            variance = squares / counts - (sums / counts) ** 2
+        volatility = np.sqrt(np.nan_to_num(variance).clip(min=0)).max(axis=1).clip(max=2.0)
+
+    closeness = np.zeros(len(ids))
+    thresholds = list(
+        AlertThreshold.objects.filter(is_active=True, condition__in=THRESHOLD_FIELDS)
+        .values_list('location_id', 'condition', 'threshold_value')
+    )
+    if thresholds:
+        threshold_locations, conditions, limits = zip(*thresholds)
+        rows = np.array([index[location_id] for location_id in threshold_locations])
+        fields = np.array([READING_FIELDS.index(THRESHOLD_FIELDS[c][0]) for c in conditions])
+        directions = np.array([THRESHOLD_FIELDS[c][1] for c in conditions])
+        np.add.at(watchers, rows, 1)
+
+        # Margin left before the threshold trips, in field scales; crossed counts as closest
+        margin = directions * (np.array(limits, dtype=np.float64) - latest[rows, fields]) / FIELD_SCALES[fields]
+        np.maximum.at(closeness, rows, np.nan_to_num((1 - margin).clip(0, 1)))
+
+    return {
+        'ids': ids,
+        'cells': np.array(cells),
+        'watchers': watchers,
+        'closeness': closeness,
+        'volatility': volatility,
+        'last_reading': last_reading,
+        'last_dispatched': last_dispatched,
+    }
+
+
+def refresh_intervals(watchers, closeness, volatility):
+    """
+    Refresh interval (seconds) per location. Urgency grows with the log of the
+    watcher count, threshold proximity and volatility, and divides the longest
+    interval (WEATHER_POLL_MAX_MINUTES), never going below WEATHER_POLL_MIN_MINUTES.
+    Unwatched locations get WEATHER_POLL_UNWATCHED_MINUTES, or inf when that is None.
+    """
+    urgency = np.log2(1 + watchers) + ALERT_WEIGHT * closeness + VOLATILITY_WEIGHT * volatility
+    intervals = (settings.WEATHER_POLL_MAX_MINUTES / (1 + urgency)).clip(
+        settings.WEATHER_POLL_MIN_MINUTES, settings.WEATHER_POLL_MAX_MINUTES
+    )
+    unwatched = settings.WEATHER_POLL_UNWATCHED_MINUTES
+    return np.where(watchers > 0, intervals, np.inf if unwatched is None else unwatched) * 60
+
+
+def next_due_cells(now=None, limit=None):
+    """
+    Fetch cells whose refresh interval has elapsed, most overdue (relative to
+    their interval) first, at most `limit` (WEATHER_POLL_MAX_REQUESTS) of them.
+
+    A cell takes the shortest interval and the oldest reading of its locations,
+    since one request refreshes them all. Handed-out locations are stamped with
+    last_dispatched_at, so no later run, in whichever worker process, queues them
+    again while they are in flight. Returns [(cell, [location ids])].
+    """
+    now = now or timezone.now()
+    limit = limit or settings.WEATHER_POLL_MAX_REQUESTS
+    demand = load_demand(now)
+    if demand is None:
+        return []
+
+    intervals = refresh_intervals(demand['watchers'], demand['closeness'], demand['volatility'])
+    cells, cell_index, cell_sizes = np.unique(demand['cells'], return_inverse=True, return_counts=True)
+    cell_index = cell_index.ravel()
+    members = np.split(demand['ids'][np.argsort(cell_index, kind='stable')], np.cumsum(cell_sizes)[:-1])
+    cell_intervals = np.full(len(cells), np.inf)
+    np.minimum.at(cell_intervals, cell_index, intervals)
+    last_refreshed = np.full(len(cells), np.inf)
+    np.minimum.at(last_refreshed, cell_index, demand['last_reading'])
+
+    # Members are dispatched together, so the oldest stamp is the cell's last dispatch
+    last_dispatched = np.full(len(cells), np.inf)
+    np.minimum.at(last_dispatched, cell_index, demand['last_dispatched'])
+    last_refreshed = np.maximum(last_refreshed, last_dispatched)
+
+    with np.errstate(invalid='ignore'):
+        overdue = (now.timestamp() - last_refreshed) / cell_intervals
+    heap = [(-ratio, i) for i, ratio in enumerate(overdue.tolist()) if ratio >= 1]
+    heapq.heapify(heap)
+
+    due = []
+    while heap and len(due) < limit:
+        _, i = heapq.heappop(heap)
+        due.append((cells[i].item(), members[i].tolist()))
+
+    if due:
+        Location.objects.filter(
+            id__in=[location_id for _, location_ids in due for location_id in location_ids]
+        ).update(last_dispatched_at=now)
+    logger.info(f"Weather polling: {len(due)} of {len(heap) + len(due)} due cells dispatched "
+                f"({len(cells)} cells, {len(demand['ids'])} locations)")
+    return due
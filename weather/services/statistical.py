@@ -0,0 +1,88 @@
+import functools
+
+import numpy as np
+from django.conf import settings
+
+
+@functools.lru_cache(maxsize=None)
+def _smoothing_weights(steps, alpha, beta, phi):
+    """
+    Damped Holt smoothing is linear in the observations, so the final level and
+    trend are dot products with fixed weights. Row n holds the weights for a
+    history of the last n days (right-aligned in `steps` slots).
+    """
+    level_weights = np.zeros((steps + 1, steps))
+    trend_weights = np.zeros((steps + 1, steps))
+    for n in range(1, steps + 1):
+        # Smooth n one-hot series at once; series i measures the influence of day i
+        basis = np.eye(n)
+        level = basis[:, 0].copy()
+        trend = np.zeros(n)
+        for t in range(1, n):
+            previous = level
+            level = alpha * basis[:, t] + (1 - alpha) * (previous + phi * trend)
+            trend = beta * (level - previous) + (1 - beta) * phi * trend
+        level_weights[n, steps - n:] = level
+        trend_weights[n, steps - n:] = trend
+    return level_weights, trend_weights
+
+
+class ExponentialSmoothingForecaster:
+    """
+    Damped-trend (Holt) exponential smoothing, vectorized over locations and features.
+
+    forecast() takes right-aligned history of shape (N, T, F), NaN-padded on the
+    left for locations with fewer than T days, and returns (N, days, F). A single
+    observed day is enough; it is then carried forward flat. The recursion is
+    precomputed into weights, so a forecast is one small tensor contraction.
+    """
+
+    name = 'exponential_smoothing'
+
+    def __init__(self, alpha=0.5, beta=0.1, phi=0.9):
+        self.alpha = alpha
+        self.beta = beta
+        self.phi = phi
+
+    def forecast(self, series, days):
+        series = np.asarray(series, dtype=np.float64)
+        level_weights, trend_weights = _smoothing_weights(series.shape[1], self.alpha, self.beta, self.phi)
+
+        observed = np.count_nonzero(~np.isnan(series[:, :, 0]), axis=1)
+        values = np.nan_to_num(series)
+        level = np.einsum('nt,ntf->nf', level_weights[observed], values)
+        trend = np.einsum('nt,ntf->nf', trend_weights[observed], values)
+
+        damping = np.cumsum(self.phi ** np.arange(1, days + 1))
+        return level[:, None, :] + damping[None, :, None] * trend[:, None, :]
+
+
+class SeasonalNaiveForecaster:
+    """
+    Repeats the last `period` days (weekly by default). Locations with less than
+    a full period of history get their last observed day repeated instead.
+    """
+
+    name = 'seasonal_naive'
+
+    def __init__(self, period=7):
+        self.period = period
+
+    def forecast(self, series, days):
+        series = np.asarray(series, dtype=np.float64)
+        steps = series.shape[1]
+        period = min(self.period, steps)
+        seasonal = series[:, steps - period + (np.arange(days) % period)]
+        last = series[:, -1:]
+        short = np.isnan(series[:, -period:, 0]).any(axis=1)
+        return np.where(short[:, None, None], last, seasonal)
+
+
+STATISTICAL_FORECASTERS = {
+    forecaster.name: forecaster
+    for forecaster in (ExponentialSmoothingForecaster, SeasonalNaiveForecaster)
+}
+
+
+def get_fallback_forecaster(name=None):
+    return STATISTICAL_FORECASTERS[name or settings.FORECAST_FALLBACK]()
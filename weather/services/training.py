@@ -0,0 +1,402 @@
+import json
+import logging
+import math
+import multiprocessing
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from weather.services.dataset import HistoricalDataset
+from weather.services.forecast_pool import _init_worker
+from weather.services.forecast_service import FEATURES, SEQUENCE_LENGTH
+from weather.services.model_registry import GLOBAL_ARTIFACT, MODEL_FILE, SCALER_FILE, artifact_key, model_registry
+
+logger = logging.getLogger(__name__)
+
+
+def build_model(mode='autoregressive', horizon=7, dropout=0.0):
+    from tensorflow.keras.layers import LSTM, Dense, Dropout, Reshape
+    from tensorflow.keras.models import Sequential
+
+    model = Sequential()
+    model.add(LSTM(64, activation='relu', input_shape=(SEQUENCE_LENGTH, len(FEATURES))))
+    if dropout:
+        # Kept active at inference time to sample forecast intervals (Monte Carlo dropout)
+        model.add(Dropout(dropout))
+    if mode == 'direct':
+        # One forward pass predicts every feature for the whole horizon
+        model.add(Dense(horizon * len(FEATURES)))
+        model.add(Reshape((horizon, len(FEATURES))))
+    else:
+        model.add(Dense(1))  # Predict temperature
+    model.compile(optimizer='adam', loss='mse')
+    return model
+
+
+def _write_json(path, data):
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
+
+
+def _read_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def _limit_threads(threads):
+    """Split the cores between pool workers instead of letting every TensorFlow runtime claim all of them."""
+    if not threads:
+        return
+    import tensorflow as tf
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+    except RuntimeError:
+        pass  # already initialized by an earlier job in this worker
+
+
+def train_artifact(job):
+    """
+    Train one artifact (a location's model or the global one) in a pool worker
+    and write it to job['output_dir']. Returns the artifact's manifest.
+    """
+    import joblib
+
+    _limit_threads(job.get('threads'))
+    start_time = time.perf_counter()
+    # Every worker maps the same dataset file, so the history is shared via the page cache
+    dataset = HistoricalDataset(job['dataset_dir']).open()
+    start, end = job['rows']
+    mode, horizon, batch_size = job['mode'], job['horizon'], job['batch_size']
+    direct = mode == 'direct'
+
+    scaler = dataset.fit_scaler(start, end)
+    indices = dataset.window_indices(SEQUENCE_LENGTH, horizon if direct else 1, start, end)
+    train_idx, val_idx = dataset.split(indices)
+    if not len(train_idx) or not len(val_idx):
+        raise ValueError(f"{job['key']}: not enough history to train ({len(indices)} windows)")
+
+    target_horizon = horizon if direct else None
+    model = build_model(mode, horizon, job['dropout'])
+    history = model.fit(
+        dataset.batches(train_idx, scaler, SEQUENCE_LENGTH, target_horizon, batch_size=batch_size),
+        steps_per_epoch=math.ceil(len(train_idx) / batch_size),
+        validation_data=dataset.batches(val_idx, scaler, SEQUENCE_LENGTH, target_horizon,
+                                        batch_size=batch_size, shuffle=False),
+        validation_steps=math.ceil(len(val_idx) / batch_size),
+        epochs=job['epochs'],
+        verbose=0,
+    )
+
+    output_dir = os.path.join(job['output_dir'], job['key'])
+    os.makedirs(output_dir, exist_ok=True)
+    model.save(os.path.join(output_dir, MODEL_FILE))
+    joblib.dump(scaler, os.path.join(output_dir, SCALER_FILE))
+    _write_json(os.path.join(output_dir, 'model.json'), {
+        'mode': mode,
+        'horizon': horizon if direct else 1,
+        'sequence_length': SEQUENCE_LENGTH,
+        'features': FEATURES,
+        'dropout': job['dropout'],
+    })
+
+    first_date, last_date = dataset.date_range(start, end)
+    manifest = {
+        'key': job['key'],
+        'location_id': job['location_id'],
+        'data_range': {'start': first_date, 'end': last_date, 'rows': end - start},
+        'metrics': {
+            'train_loss': float(history.history['loss'][-1]),
+            'val_loss': float(history.history['val_loss'][-1]),
+            'train_windows': int(len(train_idx)),
+            'val_windows': int(len(val_idx)),
+        },
+        'training_seconds': round(time.perf_counter() - start_time, 2),
+    }
+    _write_json(os.path.join(output_dir, 'manifest.json'), manifest)
+    return manifest
+
+
+def train_all(mode='autoregressive', horizon=7, epochs=50, batch_size=16, workers=None,
+              min_windows=None, rebuild=False, dropout=0.0):
+    """
+    Train a global model plus one model per location with at least `min_windows`
+    training windows, in parallel worker processes, and publish them together as
+    a new version under FORECAST_ARTIFACT_DIR. Returns (version_dir, manifests),
+    or (None, []) when there is not enough history.
+    """
+    workers = workers or settings.FORECAST_TRAIN_WORKERS
+    min_windows = settings.FORECAST_MIN_LOCATION_WINDOWS if min_windows is None else min_windows
+
+    dataset = HistoricalDataset().load(rebuild=rebuild)
+    if dataset.rows < 50:
+        logger.warning("Not enough data to train the forecast model. Need at least 50 records.")
+        return None, []
+
+    version, staging_dir = _staging_dir()
+    base_job = {
+        'dataset_dir': dataset.cache_dir,
+        'output_dir': staging_dir,
+        'mode': mode,
+        'horizon': horizon,
+        'epochs': epochs,
+        'batch_size': batch_size,
+        'dropout': dropout,
+    }
+    jobs = [{**base_job, 'key': GLOBAL_ARTIFACT, 'location_id': None, 'rows': (0, dataset.rows)}]
+
+    steps_ahead = horizon if mode == 'direct' else 1
+    window_owners = dataset.location_ids[dataset.window_indices(SEQUENCE_LENGTH, steps_ahead)]
+    owners, window_counts = np.unique(window_owners, return_counts=True)
+    slices = dataset.location_slices()
+    for location_id, count in zip(owners.tolist(), window_counts.tolist()):
+        if count >= min_windows:
+            jobs.append({**base_job, 'key': artifact_key(location_id), 'location_id': location_id,
+                         'rows': slices[location_id]})
+
+    start_time = time.perf_counter()
+    manifests, failed = _run_jobs(train_artifact, jobs, workers)
+    if GLOBAL_ARTIFACT in failed:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise RuntimeError("Global forecast model failed to train; no version was published")
+
+    version_dir = _publish(staging_dir, version, {
+        'mode': mode,
+        'horizon': horizon if mode == 'direct' else 1,
+        'artifacts': sorted(manifest['key'] for manifest in manifests),
+        'failed': sorted(failed),
+        'training_seconds': round(time.perf_counter() - start_time, 2),
+    })
+    return version_dir, manifests
+
+
+def _run_jobs(fn, jobs, workers):
+    """
+    Run fn(job) for every job, in spawn-context worker processes when workers > 1
+    (in-process otherwise, e.g. inside a Celery worker). Returns (manifests, failed keys).
+    """
+    manifests, failed = [], []
+
+    def collect(key, result):
+        try:
+            manifest = result()
+        except Exception:
+            logger.exception(f"{fn.__name__} failed for {key}")
+            failed.append(key)
+            return
+        manifests.append(manifest)
+        logger.info(
+            f"{key}: {manifest.get('status', 'trained')} in {manifest['training_seconds']}s "
+            f"(val_loss {manifest['metrics']['val_loss']:.5f})"
+        )
+
+    # Largest jobs first so a long global fit doesn't end up running alone at the end
+    jobs = sorted(jobs, key=lambda job: job['rows'][1] - job['rows'][0] if job['rows'] else 0, reverse=True)
+    workers = max(1, min(workers, len(jobs)))
+    if workers == 1:
+        for job in jobs:
+            collect(job['key'], lambda: fn(job))
+        return manifests, failed
+
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    logger.info(f"Running {len(jobs)} {fn.__name__} jobs on {workers} workers x {threads} threads")
+    # The initializer lives in a module that is importable before django.setup()
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_worker,
+    ) as executor:
+        futures = {executor.submit(fn, {**job, 'threads': threads}): job['key'] for job in jobs}
+        for future in as_completed(futures):
+            collect(futures[future], future.result)
+    return manifests, failed
+
+
+def _staging_dir():
+    """
+    Claim a new version name and its staging directory. Names are timestamps to
+    the microsecond, so they sort by age; creating the directory is exclusive,
+    so two runs starting at once (training and a fine-tune) never share one.
+    """
+    os.makedirs(settings.FORECAST_ARTIFACT_DIR, exist_ok=True)
+    while True:
+        version = timezone.now().strftime('%Y%m%dT%H%M%S%f')
+        if os.path.exists(os.path.join(settings.FORECAST_ARTIFACT_DIR, version)):
+            continue
+        # Hidden staging directory: the registry ignores it until it is renamed into place
+        staging_dir = os.path.join(settings.FORECAST_ARTIFACT_DIR, f".{version}.tmp")
+        try:
+            os.mkdir(staging_dir)
+        except FileExistsError:
+            continue
+        return version, staging_dir
+
+
+def _publish(staging_dir, version, run_manifest):
+    """
+    Write the run manifest, atomically publish the staged version, point the
+    serving workers at it and prune old ones.
+    """
+    _write_json(os.path.join(staging_dir, 'manifest.json'), {'version': version, **run_manifest})
+    version_dir = os.path.join(settings.FORECAST_ARTIFACT_DIR, version)
+    os.rename(staging_dir, version_dir)
+    model_registry.publish(version)
+
+    for name in model_registry.versions()[:-settings.FORECAST_ARTIFACT_KEEP]:
+        shutil.rmtree(os.path.join(settings.FORECAST_ARTIFACT_DIR, name), ignore_errors=True)
+    return version_dir
+
+
+def _carry_forward(job, manifest, status):
+    """Link an unchanged artifact into the new version; hard links make this nearly free."""
+    shutil.copytree(job['source_dir'], os.path.join(job['output_dir'], job['key']), copy_function=os.link)
+    return {**manifest, 'status': status, 'training_seconds': 0.0}
+
+
+def fine_tune_artifact(job):
+    """
+    Fine-tune one published artifact on the windows whose targets fall after its
+    watermark (the last day it has seen). The newest of those windows are held
+    out; the update is kept only if their loss doesn't get worse, and then they
+    get a final pass too, so every day up to the new watermark has been trained on.
+    """
+    import joblib
+    from tensorflow.keras.models import load_model
+    from tensorflow.keras.optimizers import Adam
+
+    _limit_threads(job.get('threads'))
+    start_time = time.perf_counter()
+    manifest = _read_json(os.path.join(job['source_dir'], 'manifest.json'))
+    if job['rows'] is None:
+        return _carry_forward(job, manifest, 'no history')
+
+    metadata = _read_json(os.path.join(job['source_dir'], 'model.json'))
+    direct = metadata['mode'] == 'direct'
+    steps_ahead = metadata['horizon'] if direct else 1
+    target_horizon = steps_ahead if direct else None
+    batch_size = job['batch_size']
+
+    # Only windows that end after the watermark; their first SEQUENCE_LENGTH days are context
+    dataset = HistoricalDataset(job['dataset_dir']).open()
+    start, end = job['rows']
+    indices = dataset.window_indices(SEQUENCE_LENGTH, steps_ahead, start, end)
+    watermark = np.datetime64(manifest['data_range']['end'])
+    indices = indices[dataset.dates[indices + SEQUENCE_LENGTH + steps_ahead - 1] > watermark]
+    train_idx, val_idx = dataset.split(indices)
+    if not len(train_idx):
+        # Too little new data yet; it stays past the watermark and is picked up next time
+        return _carry_forward(job, manifest, 'no new data')
+
+    scaler = joblib.load(os.path.join(job['source_dir'], SCALER_FILE))
+    model = load_model(os.path.join(job['source_dir'], MODEL_FILE), compile=False)
+    model.compile(optimizer=Adam(learning_rate=job['learning_rate']), loss='mse')
+
+    def evaluate():
+        batches = dataset.batches(val_idx, scaler, SEQUENCE_LENGTH, target_horizon,
+                                  batch_size=batch_size, shuffle=False)
+        return float(model.evaluate(batches, steps=math.ceil(len(val_idx) / batch_size), verbose=0))
+
+    previous_val_loss = evaluate()
+    history = model.fit(
+        dataset.batches(train_idx, scaler, SEQUENCE_LENGTH, target_horizon, batch_size=batch_size),
+        steps_per_epoch=math.ceil(len(train_idx) / batch_size),
+        epochs=job['epochs'],
+        verbose=0,
+    )
+    val_loss = evaluate()
+    if val_loss > previous_val_loss:
+        logger.info(f"{job['key']}: fine-tune regressed val_loss {previous_val_loss:.5f} -> {val_loss:.5f}")
+        return _carry_forward(job, manifest, 'regressed')
+
+    # The held-out days move behind the watermark, so this is their only chance to be learned
+    model.fit(
+        dataset.batches(val_idx, scaler, SEQUENCE_LENGTH, target_horizon, batch_size=batch_size),
+        steps_per_epoch=math.ceil(len(val_idx) / batch_size),
+        epochs=job['epochs'],
+        verbose=0,
+    )
+
+    output_dir = os.path.join(job['output_dir'], job['key'])
+    os.makedirs(output_dir)
+    model.save(os.path.join(output_dir, MODEL_FILE))
+    for name in (SCALER_FILE, 'model.json'):
+        os.link(os.path.join(job['source_dir'], name), os.path.join(output_dir, name))
+
+    _, last_date = dataset.date_range(start, end)
+    manifest = {
+        **manifest,
+        'data_range': {**manifest['data_range'], 'end': last_date, 'rows': end - start},
+        'metrics': {
+            'train_loss': float(history.history['loss'][-1]),
+            'val_loss': val_loss,
+            'previous_val_loss': previous_val_loss,
+            'train_windows': int(len(train_idx)),
+            'val_windows': int(len(val_idx)),
+        },
+        'fine_tuned_from': job['source_version'],
+        'training_seconds': round(time.perf_counter() - start_time, 2),
+    }
+    _write_json(os.path.join(output_dir, 'manifest.json'), manifest)
+    return {**manifest, 'status': 'fine-tuned'}
+
+
+def fine_tune(epochs=5, batch_size=16, learning_rate=1e-4, workers=None, rebuild=False):
+    """
+    Fine-tune every artifact of the current version on the days added since its
+    watermark and publish the result as a new version, so the nightly refresh
+    costs O(new days) rather than a full retrain. Returns (version_dir, manifests);
+    version_dir is None when there is no trained version or nothing improved.
+    """
+    source_dir = model_registry.current_version_dir()
+    if source_dir is None:
+        logger.warning("No trained forecast version to fine-tune; run train_forecast_model.py first")
+        return None, []
+
+    dataset = HistoricalDataset().load(rebuild=rebuild)
+    slices = dataset.location_slices()
+    source_version = os.path.basename(source_dir)
+    version, staging_dir = _staging_dir()
+
+    jobs = []
+    for key in _read_json(os.path.join(source_dir, 'manifest.json'))['artifacts']:
+        location_id = _read_json(os.path.join(source_dir, key, 'manifest.json'))['location_id']
+        jobs.append({
+            'key': key,
+            'rows': (0, dataset.rows) if location_id is None else slices.get(location_id),
+            'source_dir': os.path.join(source_dir, key),
+            'source_version': source_version,
+            'dataset_dir': dataset.cache_dir,
+            'output_dir': staging_dir,
+            'epochs': epochs,
+            'batch_size': batch_size,
+            'learning_rate': learning_rate,
+        })
+
+    start_time = time.perf_counter()
+    manifests, failed = _run_jobs(fine_tune_artifact, jobs, workers or settings.FORECAST_TRAIN_WORKERS)
+    if not any(manifest['status'] == 'fine-tuned' for manifest in manifests):
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        logger.info(f"No forecast model improved; keeping version {source_version}")
+        return None, manifests
+
+    # Artifacts whose fine-tune crashed are carried forward unchanged
+    for job in jobs:
+        if job['key'] in failed:
+            shutil.rmtree(os.path.join(staging_dir, job['key']), ignore_errors=True)
+            shutil.copytree(job['source_dir'], os.path.join(staging_dir, job['key']), copy_function=os.link)
+
+    run_manifest = _read_json(os.path.join(source_dir, 'manifest.json'))
+    version_dir = _publish(staging_dir, version, {
+        'mode': run_manifest['mode'],
+        'horizon': run_manifest['horizon'],
+        'artifacts': sorted(job['key'] for job in jobs),
+        'failed': sorted(failed),
+        'fine_tuned_from': source_version,
+        'training_seconds': round(time.perf_counter() - start_time, 2),
+    })
+    return version_dir, manifests
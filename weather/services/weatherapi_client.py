@@ -0,0 +1,156 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from urllib.parse import urljoin
+
+import numpy as np
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+# Worth another attempt: throttling and upstream/server hiccups
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class WeatherAPIClient:
+    """
+    Shared client for every WeatherAPI.com call in the project.
+
+    Each process keeps one requests.Session whose keep-alive pool holds (and is
+    limited to) `pool_size` connections to the API host, so the TCP/TLS
+    handshake is paid once per connection rather than once per request. Timeouts
+    and the retry policy (urllib3 Retry with exponential backoff on connection
+    errors, 429 and 5xx, honouring Retry-After) live here instead of at every
+    call site. stats() reports request latency and how often connections were reused.
+    """
+
+    def __init__(self, base_url=None, api_key=None, timeout=None, retries=None, backoff=None, pool_size=None):
+        self.base_url = base_url
+        self.api_key = api_key
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.pool_size = pool_size
+        self._lock = threading.Lock()
+        self._session = None
+        self._adapter = None
+        self._pid = None
+        self._requests = 0
+        self._errors = 0
+        self._latencies = deque(maxlen=1000)
+
+    def _setting(self, value, name):
+        return getattr(settings, name) if value is None else value
+
+    def _get_session(self):
+        with self._lock:
+            # Sessions (and their sockets) must not be shared across a fork
+            if self._session is None or self._pid != os.getpid():
+                retries = self._setting(self.retries, 'WEATHER_API_RETRIES')
+                self._adapter = HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=self._setting(self.pool_size, 'WEATHER_API_POOL_SIZE'),
+                    pool_block=True,  # wait for a pooled connection rather than open throwaway ones
+                    max_retries=Retry(
+                        total=retries,
+                        connect=retries,
+                        read=retries,
+                        status=retries,
+                        status_forcelist=RETRY_STATUSES,
+                        # Bulk lookups are POSTed but only read, so they are as safe to retry
+                        allowed_methods=['GET', 'POST'],
+                        backoff_factor=self._setting(self.backoff, 'WEATHER_API_BACKOFF'),
+                        respect_retry_after_header=True,
+                        raise_on_status=False,
+                    ),
+                )
+                self._session = requests.Session()
+                self._session.mount('http://', self._adapter)
+                self._session.mount('https://', self._adapter)
+                self._pid = os.getpid()
+            return self._session
+
+    def get(self, endpoint, **params):
+        """
+        GET `endpoint` (e.g. 'current.json') with the API key added; returns the
+        decoded JSON. Raises requests.RequestException like requests.get does.
+        """
+        return self._request('GET', endpoint, params)
+
+    def post(self, endpoint, body, **params):
+        return self._request('POST', endpoint, params, body)
+
+    def _request(self, method, endpoint, params, body=None):
+        session = self._get_session()
+        url = urljoin(self._setting(self.base_url, 'WEATHER_API_BASE_URL'), endpoint)
+        params = {'key': self._setting(self.api_key, 'WEATHER_API_KEY'), **params}
+
+        start = time.perf_counter()
+        try:
+            response = session.request(
+                method, url, params=params, json=body, timeout=self._setting(self.timeout, 'WEATHER_API_TIMEOUT')
+            )
+            response.raise_for_status()
+            return response.json()
+        except (requests.RequestException, ValueError):
+            with self._lock:
+                self._errors += 1
+            raise
+        finally:
+            with self._lock:
+                self._requests += 1
+                self._latencies.append(time.perf_counter() - start)
+
+    def current(self, q, **params):
+        return self.get('current.json', q=q, **params)
+
+    def history(self, q, dt, end_dt=None, **params):
+        if end_dt is not None:
+            params['end_dt'] = end_dt
+        return self.get('history.json', q=q, dt=dt, **params)
+
+    def search(self, q):
+        return self.get('search.json', q=q)
+
+    def bulk_current(self, queries):
+        """
+        Current weather for up to WEATHER_API_BULK_SIZE places in one request
+        (WeatherAPI's q=bulk). `queries` maps an id of the caller's choosing to a
+        query such as "lat,lon"; returns {id: current.json-shaped response} for
+        every place the API resolved.
+        """
+        body = {'locations': [{'q': q, 'custom_id': str(custom_id)} for custom_id, q in queries.items()]}
+        results = {}
+        for item in self.post('current.json', body, q='bulk').get('bulk', []):
+            query = item.get('query', {})
+            if 'current' in query:
+                results[query['custom_id']] = query
+            else:
+                logger.warning(f"WeatherAPI bulk lookup failed for {query.get('q')}: {query.get('error')}")
+        return results
+
+    def stats(self):
+        """Request count, errors, latency percentiles and connection reuse for this process."""
+        with self._lock:
+            latencies = np.array(self._latencies) * 1000
+            pool_map = self._adapter.poolmanager.pools if self._adapter else {}
+            pools = [pool_map[key] for key in pool_map.keys()]
+            connections = sum(pool.num_connections for pool in pools)
+            # urllib3 counts every attempt, retries included
+            attempts = sum(pool.num_requests for pool in pools)
+            return {
+                'requests': self._requests,
+                'errors': self._errors,
+                'connections': connections,
+                'connection_reuse': 1 - connections / attempts if attempts else None,
+                'p50_ms': float(np.percentile(latencies, 50)) if len(latencies) else None,
+                'p95_ms': float(np.percentile(latencies, 95)) if len(latencies) else None,
+            }
+
+
+weatherapi_client = WeatherAPIClient()
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from weather.models import HistoricalWeatherData
+from weather.services.forecast_cache import forecast_cache
+
+
+@receiver(post_save, sender=HistoricalWeatherData)
+@receiver(post_delete, sender=HistoricalWeatherData)
+def invalidate_forecast_cache(sender, instance, **kwargs):
+    """New or corrected history changes the forecast input window for that location."""
+    forecast_cache.invalidate(instance.location_id)
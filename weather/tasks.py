@@ -1,8 +1,15 @@
 from celery import shared_task
-import requests
 from django.core.mail import send_mail
 from django.conf import settings
 from .models import Location, WeatherData, AlertThreshold, AlertNotification, UserLocation
+from .services.forecast_service import ForecastService
+from .services.model_registry import model_registry
+from .services.weatherapi_client import WeatherAPIClient, weatherapi_client
+from .services.ingestion import refresh_current_weather
+from .services.polling import next_due_cells
+from .services.training import fine_tune
+from .services.accuracy import update_forecast_accuracy
+from .services.alerts import check_forecast_alerts as evaluate_forecast_alerts
 from django.contrib.auth.models import User
 import logging
 from requests.exceptions import RequestException, Timeout
@@ -13,6 +20,10 @@ import time
 
 logger = logging.getLogger(__name__)
 
+# fetch_weather_data retries through Celery (retry_backoff), so its requests are
+# made once rather than also being retried inside the HTTP client
+single_attempt_client = WeatherAPIClient(retries=0)
+
 @shared_task
 def check_weather_alerts():
     """
@@ -89,6 +100,18 @@ def check_weather_alerts():
                     notification.sent_email = True
                     notification.save()
 
+@shared_task
+def check_forecast_alerts() -> Dict[str, Any]:
+    """
+    Predictive counterpart of check_weather_alerts: evaluate every active threshold
+    against the next ALERT_FORECAST_DAYS of stored forecasts in one vectorized pass.
+    """
+    notifications = evaluate_forecast_alerts()
+    return {
+        'status': 'success',
+        'notifications': notifications
+    }
+
 @shared_task(
     bind=True,
     retry_backoff=True,
@@ -104,20 +127,7 @@ def fetch_weather_data(self, location_id):
         location = Location.objects.get(id=location_id)
         current_date = timezone.now().date()
         
-        api_url = "http://api.weatherapi.com/v1/current.json"
-        params = {
-            'key': settings.WEATHER_API_KEY,
-            'q': f"{location.latitude},{location.longitude}",
-            'aqi': 'no'
-        }
-        
-        response = requests.get(
-            api_url, 
-            params=params, 
-            timeout=(3.05, 27)
-        )
-        response.raise_for_status()
-        data = response.json()
+        data = single_attempt_client.current(f"{location.latitude},{location.longitude}", aqi='no')
 
         # Update or create weather data
         weather_data, created = WeatherData.objects.update_or_create(
@@ -196,22 +206,12 @@ def fetch_all_historical_weather_data(self, days: int = 7) -> Dict[str, Any]:
                 logger.info(f"Complete data already exists for {location.name}")
                 continue
             
-            api_url = "http://api.weatherapi.com/v1/history.json"
-            params = {
-                'key': settings.WEATHER_API_KEY,
-                'q': f"{location.latitude},{location.longitude}",
-                'dt': start_date.strftime('%Y-%m-%d'),
-                'end_dt': end_date.strftime('%Y-%m-%d')
-            }
-            
             try:
-                response = requests.get(
-                    api_url, 
-                    params=params, 
-                    timeout=(3.05, 27)
+                data = weatherapi_client.history(
+                    f"{location.latitude},{location.longitude}",
+                    dt=start_date.strftime('%Y-%m-%d'),
+                    end_dt=end_date.strftime('%Y-%m-%d'),
                 )
-                response.raise_for_status()
-                data = response.json()
                 
                 if 'forecast' in data:
                     for day_data in data['forecast']['forecastday']:
@@ -271,7 +271,103 @@ def test_celery():
     return message
 
 @shared_task
-def fetch_all_weather_data():
-    locations = Location.objects.all()
-    for location in locations:
-        fetch_weather_data.delay(location.id)
\ No newline at end of file
+def fetch_all_weather_data() -> Dict[str, Any]:
+    """
+    Refresh current weather for every location with WeatherAPI bulk requests,
+    one lookup per fetch cell. schedule_weather_refresh is the routine path;
+    this refreshes everything regardless of demand.
+    """
+    return {
+        'status': 'success',
+        **refresh_current_weather(list(Location.objects.all()))
+    }
+
+@shared_task
+def refresh_weather(location_ids) -> Dict[str, Any]:
+    """Refresh current weather for a batch of locations handed out by schedule_weather_refresh."""
+    return {
+        'status': 'success',
+        **refresh_current_weather(list(Location.objects.filter(id__in=location_ids)))
+    }
+
+@shared_task
+def schedule_weather_refresh() -> Dict[str, Any]:
+    """
+    Run by celery beat every minute: queue refresh_weather for the fetch cells
+    whose demand-based refresh interval has elapsed, most overdue first, at most
+    WEATHER_POLL_MAX_REQUESTS cells per run and WEATHER_API_BULK_SIZE per task.
+    """
+    due = next_due_cells()
+    bulk_size = settings.WEATHER_API_BULK_SIZE
+    for start in range(0, len(due), bulk_size):
+        refresh_weather.delay([
+            location_id for _, location_ids in due[start:start + bulk_size] for location_id in location_ids
+        ])
+    return {
+        'status': 'success',
+        'cells': len(due),
+        'batches': -(-len(due) // bulk_size)
+    }
+
+@shared_task
+def precompute_forecasts(days: int = 7, batch_size: int = 500) -> Dict[str, Any]:
+    """
+    Generate forecasts for every location and upsert them into WeatherForecast,
+    so request handlers can serve forecasts without running the LSTM.
+    Meant to run right after generate_daily_summary.
+    """
+    # Pick up a newly published model version before forecasting, not on the next pointer check
+    model_registry.refresh(wait=True)
+    forecast_service = ForecastService()
+    location_ids = list(Location.objects.values_list('id', flat=True))
+    rows_written = 0
+
+    for start in range(0, len(location_ids), batch_size):
+        locations = Location.objects.filter(id__in=location_ids[start:start + batch_size])
+        forecasts = forecast_service.generate_forecasts(locations, days)
+        rows_written += forecast_service.store_forecasts(forecasts)
+
+    logger.info(f"Precomputed {rows_written} forecast rows for {len(location_ids)} locations")
+    # Fresh forecasts may now cross alert thresholds
+    check_forecast_alerts.delay()
+    return {
+        'status': 'success',
+        'locations': len(location_ids),
+        'rows': rows_written
+    }
+
+
+@shared_task
+def fine_tune_forecast_models(epochs: int = 5) -> Dict[str, Any]:
+    """
+    Nightly model refresh: fine-tune the current LSTM artifacts on the days added
+    since their watermark, then re-materialize forecasts. Runs in-process since
+    Celery pool workers can't start training subprocesses.
+    """
+    try:
+        version_dir, manifests = fine_tune(epochs=epochs, workers=1)
+    finally:
+        # Forecasts are refreshed with whichever model is current, even if fine-tuning failed
+        precompute_forecasts.delay()
+
+    statuses = {}
+    for manifest in manifests:
+        statuses[manifest['status']] = statuses.get(manifest['status'], 0) + 1
+    return {
+        'status': 'published' if version_dir else 'unchanged',
+        'version': version_dir,
+        'artifacts': statuses
+    }
+
+
+@shared_task
+def compute_forecast_accuracy() -> Dict[str, Any]:
+    """
+    Nightly: score stored forecasts against the days observed since and refresh
+    ForecastAccuracy. One joined query and a vectorized pass, whatever the location count.
+    """
+    rows = update_forecast_accuracy()
+    return {
+        'status': 'success',
+        'rows': rows
+    }
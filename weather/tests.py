@@ -1,3 +1,553 @@
-from django.test import TestCase
+import importlib.util
+import os
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+from unittest import mock
+from datetime import date, timedelta
 
-# Create your tests here.
+import numpy as np
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from weather.management.commands.benchmark_ingestion import stand_in_server
+from weather.models import AlertNotification, AlertThreshold, ForecastAccuracy, HistoricalWeatherData, Location, UserLocation, WeatherData, WeatherForecast
+from weather.services.accuracy import update_forecast_accuracy
+from weather.services.alerts import check_forecast_alerts
+from weather.services.dataset import HistoricalDataset
+from weather.services.forecast_cache import forecast_cache
+from weather.services.forecast_service import ForecastService
+from weather.services.inference_server import InferenceClient, InferenceServer
+from weather.services.ingestion import AsyncIngestor
+from weather.services.numpy_lstm import NumpyLSTMModel
+from weather.services.polling import next_due_cells
+from weather.services.statistical import ExponentialSmoothingForecaster, SeasonalNaiveForecaster
+from weather.tasks import fetch_all_weather_data
+
+
+def reference_lstm(model, inputs):
+    """Straightforward per-sample LSTM used to check the vectorized forward pass."""
+    sigmoid = lambda x: 1.0 / (1.0 + np.exp(-x))
+    relu = lambda x: np.maximum(x, 0.0)
+    units = model.units
+    outputs = []
+    for sample in inputs.astype(np.float64):
+        h = np.zeros(units)
+        c = np.zeros(units)
+        for x in sample:
+            z = x @ model.kernel + h @ model.recurrent_kernel + model.bias
+            i, f, g, o = np.split(z, 4)
+            c = sigmoid(f) * c + sigmoid(i) * relu(g)
+            h = sigmoid(o) * relu(c)
+        outputs.append(h @ model.dense_kernel + model.dense_bias)
+    return np.array(outputs)
+
+
+class NumpyLSTMModelTests(SimpleTestCase):
+    def setUp(self):
+        self.model = NumpyLSTMModel.from_h5(settings.FORECAST_MODEL_PATH)
+        self.inputs = np.random.default_rng(0).random((16, 30, 4), dtype=np.float32)
+
+    def test_matches_reference_implementation(self):
+        np.testing.assert_allclose(
+            self.model.predict(self.inputs), reference_lstm(self.model, self.inputs),
+            rtol=1e-4, atol=1e-5,
+        )
+
+    def test_batch_rows_are_independent(self):
+        batched = self.model.predict(self.inputs)
+        single = self.model.predict(self.inputs[3:4])
+        np.testing.assert_allclose(batched[3:4], single, rtol=1e-5, atol=1e-6)
+
+    def test_dropout_samples_average_to_deterministic_output(self):
+        self.model.dropout = 0.2
+        repeated = np.repeat(self.inputs[:2], 4000, axis=0)
+        samples = self.model(repeated, training=True, rng=np.random.default_rng(0)).reshape(2, 4000, -1)
+
+        self.assertGreater(samples.std(axis=1).min(), 0)
+        np.testing.assert_allclose(samples.mean(axis=1), self.model.predict(self.inputs[:2]), atol=2e-2)
+
+    def test_dropout_masks_come_from_the_callers_generator(self):
+        self.model.dropout = 0.2
+        first = self.model(self.inputs, training=True, rng=np.random.default_rng(7))
+        second = self.model(self.inputs, training=True, rng=np.random.default_rng(7))
+
+        np.testing.assert_array_equal(first, second)
+        self.assertFalse(hasattr(self.model, 'rng'))
+
+    @unittest.skipUnless(importlib.util.find_spec('tensorflow'), "TensorFlow is not installed")
+    def test_matches_keras_output(self):
+        from weather.services.model_registry import load_keras_model
+
+        keras_model = load_keras_model(settings.FORECAST_MODEL_PATH)
+        np.testing.assert_allclose(
+            self.model.predict(self.inputs), keras_model.predict(self.inputs, verbose=0),
+            rtol=1e-4, atol=1e-5,
+        )
+
+
+def reference_damped_holt(history, days, alpha, beta, phi):
+    """Textbook damped Holt recursion over one series, to check the precomputed weights."""
+    level, trend = history[0], 0.0
+    for value in history[1:]:
+        previous = level
+        level = alpha * value + (1 - alpha) * (previous + phi * trend)
+        trend = beta * (level - previous) + (1 - beta) * phi * trend
+    return [level + sum(phi ** k for k in range(1, h + 1)) * trend for h in range(1, days + 1)]
+
+
+class StatisticalForecasterTests(SimpleTestCase):
+    def test_exponential_smoothing_matches_recursion_for_padded_histories(self):
+        forecaster = ExponentialSmoothingForecaster()
+        rng = np.random.default_rng(0)
+        series = np.full((3, 30, 4), np.nan)
+        lengths = [30, 12, 1]
+        for row, length in enumerate(lengths):
+            series[row, 30 - length:] = rng.normal(25, 3, (length, 4))
+
+        forecast = forecaster.forecast(series, 5)
+
+        self.assertEqual(forecast.shape, (3, 5, 4))
+        for row, length in enumerate(lengths):
+            for feature in range(4):
+                np.testing.assert_allclose(
+                    forecast[row, :, feature],
+                    reference_damped_holt(series[row, 30 - length:, feature], 5, 0.5, 0.1, 0.9),
+                )
+        # A single observed day is carried forward flat
+        np.testing.assert_allclose(forecast[2], np.repeat(series[2, -1:], 5, axis=0))
+
+    def test_seasonal_naive_repeats_last_week_or_last_day(self):
+        series = np.full((2, 30, 4), np.nan)
+        series[0] = np.arange(30)[:, None]
+        series[1, -3:] = [[20], [21], [22]]
+
+        forecast = SeasonalNaiveForecaster().forecast(series, 9)
+
+        np.testing.assert_array_equal(forecast[0, :, 0], [23, 24, 25, 26, 27, 28, 29, 23, 24])
+        np.testing.assert_array_equal(forecast[1, :, 0], [22] * 9)
+
+
+class ForecastCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.location = Location.objects.create(name='Manila', latitude=14.6, longitude=121.0)
+        self.computed = 0
+
+    def compute(self):
+        self.computed += 1
+        return [{'temperature': self.computed}]
+
+    def test_history_change_invalidates_cached_forecast(self):
+        forecast_cache.get_or_compute(self.location, 3, self.compute)
+        self.assertEqual(forecast_cache.get_or_compute(self.location, 3, self.compute), [{'temperature': 1}])
+
+        row = HistoricalWeatherData.objects.create(
+            location=self.location, date=date(2025, 3, 9), min_temp=25, max_temp=31, avg_temp=28,
+            avg_humidity=70, avg_wind_speed=10, most_common_description='Sunny',
+        )
+        self.assertEqual(forecast_cache.get_or_compute(self.location, 3, self.compute), [{'temperature': 2}])
+        row.delete()
+        self.assertEqual(forecast_cache.get_or_compute(self.location, 3, self.compute), [{'temperature': 3}])
+
+    def test_hit_counts_reach_the_shared_counters_in_batches(self):
+        forecast_cache.flush_stats()
+        cache.clear()
+        for _ in range(3):
+            forecast_cache.get_or_compute(self.location, 3, self.compute)
+
+        self.assertIsNone(cache.get('forecast_cache_hits'))
+        self.assertEqual(forecast_cache.stats()['hits'], 2)
+        self.assertEqual(forecast_cache.stats()['misses'], 1)
+
+
+class HistoricalDatasetTests(TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+        location = Location.objects.create(name='Manila', latitude=14.6, longitude=121.0)
+        self.rows = [
+            HistoricalWeatherData.objects.create(
+                location=location, date=date(2025, 3, 1) + timedelta(days=i), min_temp=25, max_temp=31,
+                avg_temp=28 + i, avg_humidity=70, avg_wind_speed=10, most_common_description='Sunny',
+            )
+            for i in range(3)
+        ]
+
+    def test_row_updated_in_place_rebuilds_the_cache(self):
+        dataset = HistoricalDataset(self.cache_dir.name).load()
+        self.assertEqual(dataset.features[1, 0], 29)
+
+        with mock.patch.object(HistoricalDataset, 'build', wraps=dataset.build) as build:
+            HistoricalDataset(self.cache_dir.name).load()
+            build.assert_not_called()
+
+            HistoricalWeatherData.objects.filter(id=self.rows[1].id).update(avg_temp=35)
+            dataset = HistoricalDataset(self.cache_dir.name).load()
+            build.assert_called_once()
+        self.assertEqual(dataset.features[1, 0], 35)
+
+
+@unittest.skipUnless(importlib.util.find_spec('tensorflow'), "TensorFlow is not installed")
+class ForecastTrainingTests(TestCase):
+    def setUp(self):
+        from weather.services.model_registry import ModelRegistry
+
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.artifact_dir = os.path.join(root.name, 'lstm')
+        settings_override = override_settings(
+            FORECAST_ARTIFACT_DIR=self.artifact_dir,
+            FORECAST_DATASET_DIR=os.path.join(root.name, 'dataset'),
+            FORECAST_TRAIN_WORKERS=1,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        registry = mock.patch('weather.services.training.model_registry', ModelRegistry())
+        self.registry = registry.start()
+        self.addCleanup(registry.stop)
+
+        self.location = Location.objects.create(name='Manila', latitude=14.6, longitude=121.0)
+        self.first_day = date(2025, 1, 1)
+        for i in range(60):
+            self.add_day(i)
+
+    def add_day(self, i):
+        HistoricalWeatherData.objects.create(
+            location=self.location, date=self.first_day + timedelta(days=i), min_temp=24, max_temp=32,
+            avg_temp=28 + np.sin(i / 3), avg_humidity=70 + i % 5, avg_wind_speed=10, most_common_description='Sunny',
+        )
+
+    def trained_days(self, run):
+        """Target dates of every window `run` fitted on (validation passes aside)."""
+        from weather.services.forecast_service import SEQUENCE_LENGTH
+
+        days = set()
+        batches = HistoricalDataset.batches
+
+        def record(dataset, indices, *args, shuffle=True, **kwargs):
+            if shuffle:
+                days.update(str(day) for day in dataset.dates[indices + SEQUENCE_LENGTH])
+            return batches(dataset, indices, *args, shuffle=shuffle, **kwargs)
+
+        with mock.patch.object(HistoricalDataset, 'batches', autospec=True, side_effect=record):
+            result = run()
+        return result, days
+
+    def test_single_day_increments_are_all_trained(self):
+        from weather.services.training import fine_tune, train_all
+
+        train_all(epochs=1, min_windows=1000)
+        self.add_day(60)
+        (version_dir, manifests), days = self.trained_days(lambda: fine_tune(epochs=1, learning_rate=0.0))
+        self.assertIsNone(version_dir)
+        self.assertEqual([manifest['status'] for manifest in manifests], ['no new data'])
+
+        self.add_day(61)
+        (version_dir, manifests), days = self.trained_days(lambda: fine_tune(epochs=1, learning_rate=0.0))
+        self.assertEqual([manifest['status'] for manifest in manifests], ['fine-tuned'])
+        self.assertEqual(days, {str(self.first_day + timedelta(days=60)), str(self.first_day + timedelta(days=61))})
+        self.assertEqual(manifests[0]['data_range']['end'], str(self.first_day + timedelta(days=61)))
+
+
+class ModelRegistryTests(SimpleTestCase):
+    def setUp(self):
+        from weather.services.model_registry import ModelRegistry
+
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.root = root.name
+        settings_override = override_settings(FORECAST_ARTIFACT_DIR=self.root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.registry = ModelRegistry()
+        for version in ('20260101T000000000000', '20260102T000000000000'):
+            self.make_version(version)
+
+    def make_version(self, version):
+        from weather.services.model_registry import GLOBAL_ARTIFACT, MODEL_FILE, SCALER_FILE
+
+        artifact_dir = os.path.join(self.root, version, GLOBAL_ARTIFACT)
+        os.makedirs(artifact_dir)
+        os.link(settings.FORECAST_MODEL_PATH, os.path.join(artifact_dir, MODEL_FILE))
+        os.link(settings.FORECAST_SCALER_PATH, os.path.join(artifact_dir, SCALER_FILE))
+
+    def serving(self):
+        return self.registry.version_of(self.registry.resolve_artifact())
+
+    def test_runs_started_together_get_distinct_versions(self):
+        from weather.services import training
+
+        now = timezone.now()
+        with mock.patch.object(training.timezone, 'now', side_effect=[now, now, now + timedelta(microseconds=1)]):
+            first, first_dir = training._staging_dir()
+            second, second_dir = training._staging_dir()
+
+        self.assertNotEqual(first, second)
+        self.assertEqual(sorted([second, first]), [first, second])
+        self.assertTrue(os.path.isdir(first_dir) and os.path.isdir(second_dir))
+
+    def test_publish_swaps_the_pointer(self):
+        self.registry.publish('20260101T000000000000')
+        self.assertEqual(self.registry.read_pointer(), '20260101T000000000000')
+        self.registry.publish('20260102T000000000000')
+        self.assertEqual(self.registry.read_pointer(), '20260102T000000000000')
+        self.assertEqual(sorted(os.listdir(self.root)), ['20260101T000000000000', '20260102T000000000000', 'CURRENT'])
+
+        with self.assertRaises(ValueError):
+            self.registry.publish('20260103T000000000000')
+        self.assertEqual(self.registry.read_pointer(), '20260102T000000000000')
+
+    def test_new_version_is_loaded_in_the_background_and_swapped_in(self):
+        self.registry.publish('20260101T000000000000')
+        self.assertEqual(self.serving(), '20260101T000000000000')
+
+        self.registry.publish('20260102T000000000000')
+        self.registry.refresh(wait=True)
+        self.assertEqual(self.serving(), '20260102T000000000000')
+        stats = self.registry.stats()
+        self.assertIsNone(stats['pending_version'])
+        # The new version's artifacts were loaded before the swap, and the old ones dropped
+        self.assertTrue(stats['loaded'])
+        self.assertTrue(all('20260102T000000000000' in path for path in stats['loaded']))
+
+    def test_command_rolls_back_to_an_earlier_version(self):
+        from django.core.management import call_command
+        from django.core.management.base import CommandError
+
+        self.registry.publish('20260102T000000000000')
+        self.assertEqual(self.serving(), '20260102T000000000000')
+
+        with mock.patch('weather.management.commands.forecast_model_version.model_registry', self.registry):
+            call_command('forecast_model_version', '20260101T000000000000', stdout=StringIO())
+            with self.assertRaises(CommandError):
+                call_command('forecast_model_version', '20250101T000000000000')
+        self.registry.refresh(wait=True)
+        self.assertEqual(self.serving(), '20260101T000000000000')
+
+
+class ForecastFallbackTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.location = Location.objects.create(name='Manila', latitude=14.6, longitude=121.0)
+        today = date(2025, 3, 10)
+        for offset in range(1, 41):
+            HistoricalWeatherData.objects.create(
+                location=self.location, date=today - timedelta(days=offset),
+                min_temp=25, max_temp=31, avg_temp=28, avg_humidity=70, avg_wind_speed=10,
+                total_precip_mm=0, most_common_description='Sunny',
+            )
+
+    def test_unloadable_model_falls_back_without_caching_or_storing(self):
+        service = ForecastService()
+        with mock.patch.object(ForecastService, 'load_lstm_model', side_effect=OSError("missing artifact")):
+            forecast_data = service.get_forecast(self.location, days=3)
+            precomputed = service.generate_forecasts([self.location], days=3)
+
+        self.assertEqual(len(forecast_data), 3)
+        self.assertEqual(forecast_data[0]['forecaster'], settings.FORECAST_FALLBACK)
+        self.assertAlmostEqual(forecast_data[0]['temperature'], 28)
+        self.assertEqual(service.store_forecasts(precomputed), 0)
+        self.assertFalse(WeatherForecast.objects.exists())
+
+        # Once the model loads again the next request uses it
+        self.assertEqual(service.get_forecast(self.location, days=3)[0]['forecaster'], 'lstm')
+        self.assertEqual(WeatherForecast.objects.count(), 3)
+
+    @override_settings(FORECAST_INFERENCE_MODE='local', FORECAST_LATENCY_BUDGET_SECONDS=0.05)
+    def test_local_inference_over_budget_falls_back(self):
+        slow_forecast = lambda location_id, days: time.sleep(0.5) or []
+        with mock.patch('weather.services.forecast_service.lstm_forecast', slow_forecast):
+            forecast_data = ForecastService().get_forecast(self.location, days=3, offload=True)
+
+        self.assertEqual(forecast_data[0]['forecaster'], settings.FORECAST_FALLBACK)
+        self.assertFalse(WeatherForecast.objects.exists())
+
+
+class InferenceServerTests(SimpleTestCase):
+    def setUp(self):
+        self.batches = []
+        address = os.path.join(tempfile.mkdtemp(), 'inference.sock')
+        self.server = InferenceServer(address, b'test', window=0.05, forecast_fn=self.forecast).start()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.client = InferenceClient(address, b'test')
+        self.addCleanup(self.server.close)
+
+    def forecast(self, location_ids, days):
+        self.batches.append(location_ids)
+        return {location_id: [location_id] * days for location_id in location_ids}
+
+    def test_concurrent_requests_share_batches(self):
+        with ThreadPoolExecutor(8) as executor:
+            results = list(executor.map(lambda i: self.client.forecast(i % 4, 3), range(8)))
+
+        self.assertEqual(results, [[i % 4] * 3 for i in range(8)])
+        self.assertLess(len(self.batches), 8)
+        self.assertEqual(self.server.requests, 8)
+
+
+class ForecastAccuracyTests(TestCase):
+    def setUp(self):
+        self.today = date(2025, 3, 10)
+        self.location = Location.objects.create(name='Manila', latitude=14.6, longitude=121.0)
+        for offset in range(1, 4):
+            HistoricalWeatherData.objects.create(
+                location=self.location, date=self.today - timedelta(days=offset),
+                min_temp=25, max_temp=31, avg_temp=28, avg_humidity=70, avg_wind_speed=10,
+                most_common_description='Sunny',
+            )
+
+    def forecast(self, base_date, forecast_date, avg_temp):
+        WeatherForecast.objects.create(
+            location=self.location, base_date=base_date, forecast_date=forecast_date,
+            avg_temp=avg_temp, min_temp=avg_temp - 2, max_temp=avg_temp + 2,
+        )
+
+    def test_errors_grouped_by_horizon(self):
+        day = self.today - timedelta(days=1)
+        self.forecast(day - timedelta(days=1), day, 29)
+        self.forecast(day - timedelta(days=2), day, 25)
+        self.forecast(day - timedelta(days=3), day - timedelta(days=1), 31)
+        # Not observed yet, so not scored
+        self.forecast(day, self.today, 40)
+
+        self.assertEqual(update_forecast_accuracy(window_days=30, today=self.today), 2)
+        one_day, two_days = ForecastAccuracy.objects.order_by('horizon')
+        self.assertEqual((one_day.samples, one_day.mae, one_day.bias, one_day.interval_coverage), (1, 1, 1, 1))
+        self.assertEqual((two_days.samples, two_days.mae, two_days.bias), (2, 3, 0))
+        self.assertAlmostEqual(two_days.rmse, 3)
+        self.assertEqual(two_days.interval_coverage, 0)
+
+    def test_api_rejects_non_numeric_location_id(self):
+        user = get_user_model().objects.create_user('ana', 'ana@example.com', 'x')
+        client = APIClient(SERVER_NAME='localhost')
+        client.force_authenticate(user)
+        response = client.get('/api/forecast/accuracy/', {'location_id': 'abc'})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_pairs_without_samples_are_pruned(self):
+        day = self.today - timedelta(days=1)
+        self.forecast(day - timedelta(days=1), day, 29)
+        update_forecast_accuracy(window_days=30, today=self.today)
+
+        update_forecast_accuracy(window_days=30, today=self.today + timedelta(days=60))
+        self.assertFalse(ForecastAccuracy.objects.exists())
+
+
+class ForecastAlertTests(TestCase):
+    def setUp(self):
+        self.today = date(2025, 3, 10)
+        self.user = get_user_model().objects.create_user('ana', 'ana@example.com', 'x')
+        self.location = Location.objects.create(name='Manila', latitude=14.6, longitude=121.0)
+        for offset, temp in enumerate([33, 36, 38, 39], start=1):
+            WeatherForecast.objects.create(
+                location=self.location, base_date=self.today, forecast_date=self.today + timedelta(days=offset),
+                avg_temp=temp, avg_humidity=60, avg_wind_speed=12,
+            )
+
+    def threshold(self, condition, value):
+        return AlertThreshold.objects.create(
+            user=self.user, location=self.location, condition=condition, threshold_value=value
+        )
+
+    def test_first_crossing_within_horizon_is_notified_once(self):
+        hot = self.threshold('temp_above', 35)
+        self.threshold('temp_above', 38.5)  # only crossed on day 4, past the horizon
+        self.threshold('humidity_below', 50)
+
+        self.assertEqual(check_forecast_alerts(days=3, today=self.today), 1)
+        notification = AlertNotification.objects.get()
+        self.assertEqual(notification.threshold, hot)
+        self.assertEqual(notification.forecast.forecast_date, self.today + timedelta(days=2))
+        self.assertIsNone(notification.weather_data)
+        self.assertEqual(len(mail.outbox), 1)
+
+        self.assertEqual(check_forecast_alerts(days=3, today=self.today), 0)
+
+
+class IngestionTests(TestCase):
+    def setUp(self):
+        self.server = stand_in_server(latency=0)
+        self.addCleanup(self.server.shutdown)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/v1/"
+        Location.objects.bulk_create(
+            Location(name=f"Town {i}", latitude=i, longitude=i) for i in range(12)
+        )
+
+    def test_stores_every_location_in_batches(self):
+        stats = AsyncIngestor(api_key='test', base_url=self.url, concurrency=4, batch_size=5).run(Location.objects.all())
+
+        # Created with bulk_create, so never saved one by one: still one cell each
+        self.assertEqual((stats['stored'], stats['failed'], stats['requests']), (12, 0, 12))
+        self.assertEqual(WeatherData.objects.count(), 12)
+        self.assertAlmostEqual(WeatherData.objects.first().wind_speed, 11.2 / 3.6)
+
+    def test_bulk_refresh_stores_every_location(self):
+        with override_settings(WEATHER_API_BASE_URL=self.url, WEATHER_API_KEY='test', WEATHER_API_BULK_SIZE=5):
+            result = fetch_all_weather_data()
+
+        self.assertEqual((result['stored'], result['failed']), (12, 0))
+        self.assertEqual(WeatherData.objects.count(), 12)
+
+    def test_neighbours_in_a_fetch_cell_share_one_request(self):
+        Location.objects.create(name="Town 0 North", latitude=0.001, longitude=0)
+        Location.objects.create(name="Town 1 East", latitude=1, longitude=1.001)
+
+        stats = AsyncIngestor(api_key='test', base_url=self.url, concurrency=4).run(Location.objects.all())
+        with override_settings(WEATHER_API_BASE_URL=self.url, WEATHER_API_KEY='test', WEATHER_API_BULK_SIZE=5):
+            result = fetch_all_weather_data()
+
+        self.assertEqual((stats['requests'], stats['stored']), (12, 14))
+        self.assertEqual((result['cells'], result['requests'], result['stored']), (12, 3, 14))
+        self.assertEqual(WeatherData.objects.filter(location__name="Town 0 North").count(), 2)
+
+    def test_unreachable_upstream_is_retried_then_reported(self):
+        stats = AsyncIngestor(
+            api_key='test', base_url='http://127.0.0.1:1/', concurrency=4, retries=2, backoff=0
+        ).run(Location.objects.all()[:3])
+
+        self.assertEqual((stats['failed'], stats['retries']), (3, 6))
+        self.assertFalse(WeatherData.objects.exists())
+
+
+class PollingSchedulerTests(TestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        users = [get_user_model().objects.create_user(f'user{i}', f'user{i}@example.com', 'x') for i in range(3)]
+        self.popular, self.followed, self.unwatched, self.near_alert = (
+            Location.objects.create(name=name, latitude=i, longitude=i)
+            for i, name in enumerate(["Popular", "Followed", "Unwatched", "Near alert"])
+        )
+        for user in users:
+            UserLocation.objects.create(user=user, location=self.popular)
+        UserLocation.objects.create(user=users[0], location=self.followed)
+        UserLocation.objects.create(user=users[0], location=self.near_alert)
+        AlertThreshold.objects.create(user=users[0], location=self.near_alert, condition='temp_above', threshold_value=30.5)
+        for location in Location.objects.all():
+            WeatherData.objects.create(
+                location=location, timestamp=self.now - timedelta(minutes=25),
+                temperature=30, humidity=60, wind_speed=2, pressure=1010,
+            )
+
+    def test_due_cells_follow_demand_and_are_dispatched_once(self):
+        # Intervals: near alert ~12 min, popular 20 min, followed 30 min, unwatched 6 hours
+        due = next_due_cells(now=self.now)
+
+        self.assertEqual([ids for _, ids in due], [[self.near_alert.id], [self.popular.id]])
+        # Dispatch marks live in the database, not in any one process's memory
+        cache.clear()
+        self.assertEqual(next_due_cells(now=self.now + timedelta(minutes=1)), [])
+        with override_settings(WEATHER_POLL_UNWATCHED_MINUTES=None):
+            later = next_due_cells(now=self.now + timedelta(days=1))
+        self.assertNotIn([self.unwatched.id], [ids for _, ids in later])
@@ -4,6 +4,7 @@ from django.conf import settings
 from django.conf.urls.static import static
 from weather.views import SignupAPIView, LoginAPIView, WeatherHistoryAPIView, LocationSearchAPIView, DashboardAPIView, AddUserLocationAPIView, FetchWeatherDataAPIView
 from weather.views import AlertsAPIView, AlertCreateAPIView, AlertToggleAPIView, AlertDeleteAPIView, MarkNotificationReadAPIView, ForecastAPIView, LocationListAPIView
+from weather.views import ForecastAccuracyAPIView
 from weather.views import LocationDeleteAPIView, ProfileUpdateAPIView, ProfileAPIView, PasswordResetConfirmView, PasswordResetRequestView, ChangePasswordAPIView
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from django.middleware.csrf import get_token
@@ -35,6 +36,7 @@ urlpatterns = [
     path('api/locations/add/', AddUserLocationAPIView.as_view(), name='add-user-location'),
     # Forecast using Prophet
     path('api/forecast/<int:location_id>/<int:days>/', ForecastAPIView.as_view(), name='forecast'),
+    path('api/forecast/accuracy/', ForecastAccuracyAPIView.as_view(), name='forecast_accuracy'),
     # Alert management
     path('api/alerts/', AlertsAPIView.as_view(), name='alerts'),
     path('api/alerts/create/', AlertCreateAPIView.as_view(), name='alert_create'),
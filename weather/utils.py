@@ -1,9 +1,11 @@
-from datetime import timezone
 from django.core.cache import cache
 from django.conf import settings
-import requests # type: ignore
+from django.utils import timezone
+from requests.exceptions import RequestException # type: ignore
 
 from weather.models import WeatherData # type: ignore
+from weather.services.ingestion import parse_current
+from weather.services.weatherapi_client import weatherapi_client
 
 def get_weather_data_with_cache(location):
     """
@@ -17,7 +19,7 @@ def get_weather_data_with_cache(location):
     
     # Check if we have recent data in the database
     today = timezone.now().date()
-    db_data = WeatherData.objects.filter(location=location, date=today).first()
+    db_data = WeatherData.objects.filter(location=location, timestamp__date=today).first()
     
     if db_data:
         # Cache the database data
@@ -25,23 +27,16 @@ def get_weather_data_with_cache(location):
         return db_data
     
     # Make the API call if no cached or recent data exists
-    weather_url = f"{settings.WEATHER_API_URL}?lat={location.latitude}&lon={location.longitude}&appid={settings.WEATHER_API_KEY}&units=metric"
-    response = requests.get(weather_url)
-    
-    if response.status_code == 200:
-        data = response.json()
-        
+    try:
+        data = weatherapi_client.current(f"{location.latitude},{location.longitude}")
+    except RequestException:
+        data = None
+
+    weather_data = parse_current(location, data, timezone.now()) if data is not None else None
+    if weather_data is not None:
         # Save weather data to database
-        weather_data = WeatherData.objects.create(
-            location=location,
-            date=today,
-            temperature=data['main']['temp'],
-            humidity=data['main']['humidity'],
-            wind_speed=data['wind']['speed'],
-            pressure=data['main']['pressure'],
-            description=data['weather'][0]['description']
-        )
-        
+        weather_data.save()
+
         # Cache the new data
         cache.set(cache_key, weather_data, settings.CACHE_TTL)
         return weather_data
@@ -4,18 +4,14 @@ from rest_framework.response import Response
 from django.shortcuts import get_object_or_404, render, redirect
 from django.contrib.auth.decorators import login_required
 from django.conf import settings
-import os
-from weather.models import AlertNotification, AlertThreshold, Location, WeatherData, UserLocation, WeatherForecast, HistoricalWeatherData
-import pandas as pd
-import numpy as np
-from prophet import Prophet
+from weather.models import AlertNotification, AlertThreshold, Location, WeatherData, UserLocation, WeatherForecast, HistoricalWeatherData, ForecastAccuracy, fetch_cell_bounds
 from django.utils import timezone
 from datetime import datetime, timedelta
 import requests
 import logging
 from requests.exceptions import RequestException
 from rest_framework.permissions import IsAuthenticated, AllowAny
-from .serializers import LocationSerializer, HistoricalWeatherDataSerializer, LocationWithWeatherSerializer, WeatherDataSerializer
+from .serializers import LocationSerializer, HistoricalWeatherDataSerializer, LocationWithWeatherSerializer, WeatherDataSerializer, ForecastAccuracySerializer
 from django.contrib.auth import authenticate
 from rest_framework.generics import ListAPIView, DestroyAPIView
 from rest_framework import status
@@ -27,9 +23,9 @@ from django.core.mail import send_mail
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes
-import joblib
-from tensorflow.keras.models import load_model
 from weather.services.forecast_service import ForecastService
+from weather.services.forecast_pool import ForecastUnavailable
+from weather.services.weatherapi_client import weatherapi_client
 
 logger = logging.getLogger(__name__)
 
@@ -75,9 +71,13 @@ class DashboardAPIView(APIView):
                 date__lte=today
             ).order_by('date')
 
-            # Generate forecast data
+            # Generate forecast data; a busy forecast pool shouldn't take the whole dashboard down
             forecast_service = ForecastService()
-            forecast_data = forecast_service.generate_forecast(location, days=7)
+            try:
+                forecast_data = forecast_service.get_forecast(location, days=7, offload=True)
+            except ForecastUnavailable as e:
+                logger.warning(f"Dashboard forecast unavailable: {str(e)}")
+                forecast_data = forecast_service.get_stored_forecast(location, days=7, max_age_hours=0)
 
             # Serialize the data
             alerts_data = [{
@@ -122,109 +122,37 @@ logger = logging.getLogger(__name__)
 
 class ForecastAPIView(APIView):
     permission_classes = [IsAuthenticated]
-    
-    # Class-level cache (only load once)
-    lstm_model = None
-    scaler = None
-
-    def load_lstm_model(self):
-        model_path = os.path.join(settings.BASE_DIR, 'weather_forecast_lstm.h5')
-        scaler_path = os.path.join(settings.BASE_DIR, 'weather_scaler.save')
-
-        self.lstm_model = load_model(model_path, compile=False)
-        self.scaler = joblib.load(scaler_path)
 
     def get(self, request, location_id, days):
         if days not in [3, 5, 7]:
             return Response({'error': 'Invalid number of days. Choose 3, 5, or 7.'}, status=status.HTTP_400_BAD_REQUEST)
 
         location = get_object_or_404(Location, pk=location_id)
-        forecast_data = self.generate_forecast(location, days)
+        try:
+            forecast_data = self.generate_forecast(location, days)
+        except ForecastUnavailable as e:
+            # Serve the last stored forecast, however old, rather than queueing more work
+            forecast_data = ForecastService().get_stored_forecast(location, days, max_age_hours=0)
+            if not forecast_data:
+                return Response(
+                    {'error': f'{str(e)}. Please try again shortly.'},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    headers={'Retry-After': '5'}
+                )
 
         if not forecast_data:
             return Response({'error': 'Not enough historical data to generate forecast.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        return Response({'forecast': forecast_data}, status=status.HTTP_200_OK)
+        return Response({
+            'forecast': forecast_data,
+            # Version of the model artifacts behind this forecast; None when the statistical fallback answered
+            'model_version': forecast_data[0].get('model_version'),
+        }, status=status.HTTP_200_OK)
 
     def generate_forecast(self, location, days=7):
-        self.load_lstm_model()
-        
-        # Fetch historical data
-        historical_data = list(
-            HistoricalWeatherData.objects.filter(location=location)
-            .order_by('date')
-            .values('date', 'avg_temp', 'avg_humidity', 'avg_wind_speed', 'total_precip_mm', 'location')
-        )
-
-        if len(historical_data) < 30:  # Minimum 30 days required
-            return []
-
-        df = pd.DataFrame(historical_data)
-
-        # Select relevant features
-        features = ['avg_temp', 'avg_humidity', 'avg_wind_speed', 'total_precip_mm']
-        input_data = df[features].values[-30:]  # Last 30 days
-
-        # Normalize the input
-        input_scaled = self.scaler.transform(input_data)
-        input_scaled = np.expand_dims(input_scaled, axis=0)  # Shape: (1, 30, 4)
-
-        forecast_data = []
-        current_input = input_scaled
-
-        from datetime import timedelta
-        last_date = df['date'].iloc[-1]
-
-        for i in range(days):
-            # Predict next step (still scaled)
-            pred_scaled = self.lstm_model.predict(current_input)[0][0]
-
-            # Prepare next input by updating temperature
-            next_features = np.copy(current_input[0][-1])
-            next_features[0] = pred_scaled  # Replace only temperature
-            next_input = next_features.reshape(1, -1)
-
-            # Inverse scale to get real-world values
-            actual_values = self.scaler.inverse_transform(next_input)
-            real_temp = actual_values[0][0]  # Extract actual temperature
-
-            # Append forecast result
-            forecast_data.append({
-                'date': (last_date + timedelta(days=i+1)),
-                'location': location.name,
-                'temperature': round(real_temp, 1),
-                'min_temp': round(real_temp - 2, 1),
-                'max_temp': round(real_temp + 2, 1),
-                'description': self.get_weather_description(real_temp),
-            })
-
-            # Update the input sequence (sliding window approach)
-            updated_features_scaled = np.copy(current_input[0][-1])
-            updated_features_scaled[0] = pred_scaled  # Predicted temp (still scaled)
-
-            next_sequence = np.vstack((current_input[0][1:], updated_features_scaled))
-            current_input = np.expand_dims(next_sequence, axis=0)
-
-        return forecast_data
-
-
-    def get_weather_description(self, temp):
-        if temp > 30:
-            return "Sunny"
-        elif temp > 25:
-            return "Clear"
-        elif temp > 20:
-            return "Partly cloudy"
-        elif temp > 15:
-            return "Cloudy"
-        elif temp > 10:
-            return "Overcast"
-        elif temp > 5:
-            return "Foggy"
-        elif temp > 0:
-            return "Snowy"
-        else:
-            return "Freezing"
+        # Served from WeatherForecast, falling back to the batched LSTM engine in the forecast pool
+        # and, past the latency budget, to the statistical forecaster
+        return ForecastService().get_forecast(location, days, offload=True)
 
 class WeatherHistoryAPIView(APIView):
     permission_classes = [IsAuthenticated]
@@ -548,11 +476,7 @@ class LocationSearchAPIView(APIView):
         
         try:
             # Use WeatherAPI.com to search locations
-            weatherapi_url = f"http://api.weatherapi.com/v1/search.json?key={settings.WEATHER_API_KEY}&q={query}"
-            response = requests.get(weatherapi_url, timeout=5)
-            response.raise_for_status()
-            
-            locations = response.json()
+            locations = weatherapi_client.search(query)
             if not locations:
                 return Response(
                     {'error': 'Location not found. Please try again.'},
@@ -611,28 +535,43 @@ class AddUserLocationAPIView(APIView):
                 defaults={'latitude': latitude, 'longitude': longitude}
             )
             
-            # Fetch weather details from external API and save WeatherData
-            weather_url = f"http://api.weatherapi.com/v1/current.json?key={settings.WEATHER_API_KEY}&q={latitude},{longitude}"
-            weather_response = requests.get(weather_url, timeout=5)
-            weather_response.raise_for_status()
-            weather_data = weather_response.json()
-            weather_icon_url = weather_data['current']['condition']['icon']
-            if weather_icon_url.startswith('//'):
-                weather_icon_url = f"https:{weather_icon_url}"
-            elif not weather_icon_url.startswith('https://'):
-                weather_icon_url = f"https://{weather_icon_url}"
-            
-            WeatherData.objects.create(
-                location=location,
-                temperature=weather_data['current']['temp_c'],
-                feels_like=weather_data['current']['feelslike_c'],
-                humidity=weather_data['current']['humidity'],
-                wind_speed=weather_data['current']['wind_kph'],
-                pressure=weather_data['current']['pressure_mb'],
-                description=weather_data['current']['condition']['text'],
-                weather_icon_url=weather_icon_url,
-                timestamp=timezone.now()
+            # A nearby location's recent reading (same fetch cell) saves the upstream call
+            (lat_low, lat_high), (lon_low, lon_high) = fetch_cell_bounds(location.latitude, location.longitude)
+            neighbour_reading = (
+                WeatherData.objects
+                .filter(
+                    location__latitude__gte=lat_low, location__latitude__lt=lat_high,
+                    location__longitude__gte=lon_low, location__longitude__lt=lon_high,
+                    timestamp__gte=timezone.now() - timedelta(minutes=settings.WEATHER_FETCH_CELL_MAX_AGE_MINUTES),
+                )
+                .exclude(location=location)
+                .order_by('-timestamp')
+                .first()
             )
+            if neighbour_reading is not None:
+                neighbour_reading.pk = None
+                neighbour_reading.location = location
+                neighbour_reading.save()
+            else:
+                # Fetch weather details from external API and save WeatherData
+                weather_data = weatherapi_client.current(f"{latitude},{longitude}")
+                weather_icon_url = weather_data['current']['condition']['icon']
+                if weather_icon_url.startswith('//'):
+                    weather_icon_url = f"https:{weather_icon_url}"
+                elif not weather_icon_url.startswith('https://'):
+                    weather_icon_url = f"https://{weather_icon_url}"
+
+                WeatherData.objects.create(
+                    location=location,
+                    temperature=weather_data['current']['temp_c'],
+                    feels_like=weather_data['current']['feelslike_c'],
+                    humidity=weather_data['current']['humidity'],
+                    wind_speed=weather_data['current']['wind_kph'],
+                    pressure=weather_data['current']['pressure_mb'],
+                    description=weather_data['current']['condition']['text'],
+                    weather_icon_url=weather_icon_url,
+                    timestamp=timezone.now()
+                )
             
             # Associate the location with the user
             user_location, created = UserLocation.objects.get_or_create(
@@ -679,25 +618,22 @@ class FetchWeatherDataAPIView(APIView):
                 return Response(self._serialize_weather_data(existing_data))
 
             # Fetch weather data from external API
-            weather_url = f"{settings.WEATHER_API_URL}?lat={location.latitude}&lon={location.longitude}&appid={settings.WEATHER_API_KEY}&units=metric"
-            response = requests.get(weather_url, timeout=5)
-            response.raise_for_status()
-            
-            data = response.json()
-            
+            data = weatherapi_client.current(f"{location.latitude},{location.longitude}")
+            current = data['current']
+
             # Download the weather icon
-            icon_url = f"https://openweathermap.org/img/wn/{data['weather'][0]['icon']}@2x.png"
+            icon_url = f"https:{current['condition']['icon']}"
             icon_response = requests.get(icon_url, timeout=5)
-            icon_filename = f"{data['weather'][0]['icon']}.png"
+            icon_filename = icon_url.rsplit('/', 1)[-1]
 
             weather_data = WeatherData(
                 location=location,
-                temperature=data['main']['temp'],
-                feels_like=data['main']['feels_like'],
-                humidity=data['main']['humidity'],
-                wind_speed=data['wind']['speed'],
-                pressure=data['main']['pressure'],
-                description=data['weather'][0]['description'],
+                temperature=current['temp_c'],
+                feels_like=current['feelslike_c'],
+                humidity=current['humidity'],
+                wind_speed=current['wind_kph'] / 3.6,  # Convert km/h to m/s
+                pressure=current['pressure_mb'],
+                description=current['condition']['text'],
                 timestamp=timezone.now(),
             )
 
@@ -809,6 +745,28 @@ class LocationListAPIView(ListAPIView):
     queryset = Location.objects.all()
     serializer_class = LocationWithWeatherSerializer
 
+class ForecastAccuracyAPIView(ListAPIView):
+    """Rolling forecast accuracy per location and horizon; ?location_id= narrows it to one location."""
+    permission_classes = [IsAuthenticated]
+    serializer_class = ForecastAccuracySerializer
+
+    def list(self, request, *args, **kwargs):
+        location_id = request.query_params.get('location_id')
+        try:
+            self.location_id = int(location_id) if location_id else None
+        except ValueError:
+            return Response(
+                {'error': 'Invalid location_id. Use a numeric location id'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return super().list(request, *args, **kwargs)
+
+    def get_queryset(self):
+        queryset = ForecastAccuracy.objects.select_related('location')
+        if self.location_id is not None:
+            queryset = queryset.filter(location_id=self.location_id)
+        return queryset
+
 class LocationDeleteAPIView(DestroyAPIView):
     permission_classes = [IsAuthenticated]
     queryset = Location.objects.all()
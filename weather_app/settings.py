@@ -113,6 +113,26 @@ DATABASES = {
     }
 }
 
+# Forecast cache entries, hit/miss counters and invalidation generations must be
+# seen by every process (gunicorn workers, Celery, management commands), so the
+# cache is shared: Redis when REDIS_URL is set, otherwise a database table
+# (`python manage.py createcachetable`).
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'weather_cache',
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -140,9 +160,76 @@ LOGIN_REDIRECT_URL = 'dashboard'
 LOGOUT_REDIRECT_URL = 'login'
 
 WEATHER_API_KEY = os.getenv('WEATHER_API')  # Add to your environment variables
-WEATHER_API_URL = 'https://api.weatherapi.com/v1/current.json'
+# Every WeatherAPI.com call goes through weather/services/weatherapi_client.py
+WEATHER_API_BASE_URL = os.getenv('WEATHER_API_BASE_URL', 'https://api.weatherapi.com/v1/')
+WEATHER_API_TIMEOUT = (3.05, 10)  # connect, read seconds
+WEATHER_API_RETRIES = 3  # on connection errors, 429 and 5xx, with exponential backoff
+WEATHER_API_BACKOFF = 0.5
+WEATHER_API_POOL_SIZE = 20  # keep-alive connections per process
+WEATHER_API_BULK_SIZE = 50  # locations per bulk request, the API's limit
+# Locations in the same grid cell (about 2km) share one upstream fetch
+WEATHER_FETCH_CELL_DEGREES = 0.02
+WEATHER_FETCH_CELL_MAX_AGE_MINUTES = 60  # a new location reuses a cell neighbour's reading this fresh
 CACHE_TTL = 3600 
 
+# Forecast model artifacts
+FORECAST_MODEL_PATH = os.path.join(BASE_DIR, 'weather_forecast_lstm.h5')
+FORECAST_SCALER_PATH = os.path.join(BASE_DIR, 'weather_scaler.save')
+# 'numpy' runs the LSTM forward pass without TensorFlow; 'keras' uses tensorflow.keras
+FORECAST_BACKEND = os.getenv('FORECAST_BACKEND', 'numpy')
+FORECAST_MAX_AGE_HOURS = 36  # Stored forecasts older than this are regenerated on read
+FORECAST_CACHE_TTL = 60 * 60 * 24
+FORECAST_CACHE_STATS_FLUSH_SECONDS = 60  # how often hit/miss counts reach the shared cache
+PROPHET_MODEL_DIR = os.path.join(BASE_DIR, 'forecast_models', 'prophet')
+FORECAST_DATASET_DIR = os.path.join(BASE_DIR, 'forecast_models', 'dataset')  # memory-mapped training data
+# Versioned LSTM artifacts: <version>/<location-ID|global>/{model.h5,scaler.save,model.json,manifest.json}.
+# FORECAST_MODEL_PATH / FORECAST_SCALER_PATH are only used until the first versioned run exists.
+FORECAST_ARTIFACT_DIR = os.path.join(BASE_DIR, 'forecast_models', 'lstm')
+FORECAST_TRAIN_WORKERS = int(os.getenv('FORECAST_TRAIN_WORKERS', os.cpu_count() or 1))
+FORECAST_MIN_LOCATION_WINDOWS = 365  # locations with less history are served by the global model
+FORECAST_ARTIFACT_KEEP = 7  # published versions kept on disk, newest first
+FORECAST_VERSION_CHECK_SECONDS = 5  # how often workers re-read the CURRENT version pointer
+
+# Process pool for CPU-bound forecast work (see weather/services/forecast_pool.py)
+FORECAST_POOL_WORKERS = int(os.getenv('FORECAST_POOL_WORKERS', 2))
+FORECAST_POOL_MAX_QUEUE = int(os.getenv('FORECAST_POOL_MAX_QUEUE', 8))  # queued + running jobs
+FORECAST_POOL_START_METHOD = 'spawn'
+FORECAST_DEADLINE_SECONDS = 20
+# Past this, requests are answered by the statistical fallback (see weather/services/statistical.py)
+FORECAST_LATENCY_BUDGET_SECONDS = float(os.getenv('FORECAST_LATENCY_BUDGET_SECONDS', 2))
+FORECAST_FALLBACK = 'exponential_smoothing'
+# Monte Carlo dropout intervals for models trained with --dropout: K stochastic
+# samples per forecast, min_temp/max_temp are these percentiles of the samples
+FORECAST_MC_SAMPLES = 50
+FORECAST_INTERVAL_PERCENTILES = [10, 90]
+# Where offloaded forecasts run: 'pool' (a process pool per worker), 'server' (a
+# shared sidecar started with `manage.py run_inference_server` on the same host) or
+# 'local' (threads of the request's own process, sharing the models gunicorn.conf.py
+# preloads; gunicorn.conf.py makes it the web process default). All three fall back
+# to the statistical forecaster past FORECAST_LATENCY_BUDGET_SECONDS.
+FORECAST_INFERENCE_MODE = os.getenv('FORECAST_INFERENCE_MODE', 'pool')
+FORECAST_INFERENCE_SOCKET = os.getenv('FORECAST_INFERENCE_SOCKET', '/tmp/weather-forecast.sock')
+FORECAST_INFERENCE_AUTHKEY = os.getenv('FORECAST_INFERENCE_AUTHKEY', SECRET_KEY or '')
+FORECAST_INFERENCE_BATCH_WINDOW_MS = 5  # how long the server waits to coalesce requests
+FORECAST_INFERENCE_MAX_BATCH = 256
+FORECAST_ACCURACY_WINDOW_DAYS = 30  # rolling window of observed days scored by update_forecast_accuracy
+ALERT_FORECAST_DAYS = 3  # predictive alerts look this many forecast days ahead
+# Demand-driven polling (weather.services.polling): each fetch cell is refreshed
+# every MIN..MAX minutes depending on its subscribers, active alert thresholds
+# close to tripping and how much its readings moved over the last VOLATILITY_HOURS.
+# Cells nobody watches refresh every UNWATCHED_MINUTES (None: never).
+WEATHER_POLL_MIN_MINUTES = 10
+WEATHER_POLL_MAX_MINUTES = 60
+WEATHER_POLL_UNWATCHED_MINUTES = 360
+WEATHER_POLL_VOLATILITY_HOURS = 6
+WEATHER_POLL_MAX_REQUESTS = 200  # cells dispatched per scheduler run, the upstream quota budget
+CELERY_BEAT_SCHEDULE = {
+    'schedule-weather-refresh': {
+        'task': 'weather.tasks.schedule_weather_refresh',
+        'schedule': 60.0,
+    },
+}
+
 
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/5.0/howto/static-files/